@@ -0,0 +1,88 @@
+import io
+import sys
+import time
+import tarfile
+import zipfile
+import threading
+from typing import BinaryIO, Optional, Union
+
+from ncm.io import IOPolicy
+
+ARCHIVE_TAR = 'tar'
+ARCHIVE_ZIP = 'zip'
+ARCHIVE_FORMATS = (ARCHIVE_TAR, ARCHIVE_ZIP)
+
+# 输出缓冲区大小，保证以大块顺序写出
+WRITE_BUFFER = 4 * 1024 * 1024
+
+class ArchiveWriter:
+    """
+    把转换结果顺序写入 tar (流式) 或 zip (仅存储) 归档，可以写到文件或标准输出。
+    多个工作线程共享一个实例，写入时加锁保证每个成员完整连续。
+    """
+
+    def __init__(self, target: Union[str, BinaryIO], format: str = ARCHIVE_TAR,
+                 io_policy: Optional[IOPolicy] = None):
+        """target 是文件路径、"-" (标准输出) 或者一个可写的文件对象 (不会被关闭)"""
+        self.format = format
+        self.lock = threading.Lock()
+        self.count = 0
+        self.bytes = 0
+
+        # "-" 表示标准输出；使用 sys.__stdout__ 是因为日志输出此时会被重定向到 stderr
+        if not isinstance(target, str):
+            self._owns = False
+            self.fd = target
+        elif target == '-':
+            self._owns = False
+            self.fd: BinaryIO = io.BufferedWriter(io.FileIO(sys.__stdout__.fileno(), 'wb', closefd=False),
+                                                  buffer_size=WRITE_BUFFER)
+        else:
+            self._owns = True
+            self.fd = open(target, 'wb', buffering=WRITE_BUFFER)
+
+        # 写入的数据不会再被读取，按策略释放页缓存
+        self.tracker = (io_policy or IOPolicy()).tracker(self.fd, writing=True)
+
+        self.tar: Optional[tarfile.TarFile] = None
+        self.zip: Optional[zipfile.ZipFile] = None
+        if format == ARCHIVE_ZIP:
+            self.zip = zipfile.ZipFile(self.fd, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            # "w|" 为流式写入，不需要 seek
+            self.tar = tarfile.open(fileobj=self.fd, mode='w|', bufsize=WRITE_BUFFER)
+
+    def add(self, name: str, data) -> None:
+        """写入一个成员，name 使用 / 分隔的相对路径"""
+        data = memoryview(data)
+        with self.lock:
+            if self.zip:
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                self.zip.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                info.mode = 0o644
+                self.tar.addfile(info, io.BytesIO(data))
+            self.count += 1
+            self.bytes += len(data)
+            self.tracker.update(self.bytes)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.zip:
+                self.zip.close()
+            else:
+                self.tar.close()
+            self.fd.flush()
+            self.tracker.finish()
+            if self._owns:
+                self.fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
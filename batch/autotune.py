@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import platform
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 默认的解密块大小和读取缓冲区 (与 Converter/NCMFile 的默认值一致)
+DEFAULT_BLOCK_SIZE = 0x8000
+# 候选块大小，都是 256 的倍数以保持密钥流对齐
+BLOCK_SIZES = [0x8000, 0x40000, 0x100000, 0x400000]
+
+PROFILE_PATH = os.path.join(os.path.expanduser('~'), '.config', 'ncmease', 'profiles.json')
+
+def host_name() -> str:
+    return platform.node() or 'localhost'
+
+def load_profile(path: str = PROFILE_PATH) -> Optional[dict]:
+    """读取本机保存的调优结果"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get(host_name())
+    except (OSError, ValueError):
+        return None
+
+def save_profile(profile: dict, path: str = PROFILE_PATH) -> None:
+    """按主机名保存调优结果"""
+    profiles = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            profiles = json.load(f)
+    except (OSError, ValueError):
+        pass
+    profiles[host_name()] = profile
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=2)
+
+class Trial:
+    """一组参数的一次测量：只统计在这组参数下提交的任务"""
+
+    def __init__(self, workers: int, block_size: int):
+        self.workers = workers
+        self.block_size = block_size
+        self.started: Optional[float] = None
+        self.warmed = False  # 第一个任务已完成，之后才开始计时
+        self.finished = 0
+        self.bytes = 0
+        self.throughput = 0.0  # MB/s
+
+class Autotuner:
+    """
+    在批处理的前若干个文件上测量吞吐量 (MB/s)，先逐步增加并发数直到吞吐量不再提升，
+    再在选定的并发数下比较不同的块大小。调优结束后保持最优参数。
+    """
+
+    def __init__(self, max_workers: int, window: int = 4, start_workers: int = 1):
+        self.max_workers = max_workers
+        self.window = window
+        self.lock = threading.Lock()
+
+        self.worker_choices = sorted({n for n in (1, 2, 4, 8, 16, 32, 64) if n <= max_workers} | {max_workers})
+        self.worker_choices = [n for n in self.worker_choices if n >= start_workers] or [max_workers]
+        self.phase = 'workers'
+        self.queue: List[Tuple[int, int]] = [(n, DEFAULT_BLOCK_SIZE) for n in self.worker_choices]
+        self.results: List[Trial] = []
+        self.trial = Trial(*self.queue.pop(0))
+        self.best: Optional[Trial] = None
+
+    @property
+    def done(self) -> bool:
+        return self.phase == 'done'
+
+    def current(self) -> Tuple[Trial, int, int]:
+        """返回当前的测量、并发数和块大小，提交任务前调用"""
+        with self.lock:
+            if self.trial.started is None:
+                self.trial.started = time.monotonic()
+            return self.trial, self.trial.workers, self.trial.block_size
+
+    def record(self, trial: Trial, nbytes: int) -> None:
+        """任务完成时调用，记录它所属测量的数据量"""
+        with self.lock:
+            if self.done or trial is not self.trial:
+                return
+            if not trial.warmed:
+                # 丢弃每组测量的第一个任务：它可能承担 JIT 编译、冷缓存和线程启动的开销，
+                # 从它完成时开始计时
+                trial.warmed = True
+                trial.started = time.monotonic()
+                return
+            trial.finished += 1
+            trial.bytes += nbytes
+            # 窗口至少要让所有工作线程各完成两次，测量才接近稳定状态
+            if trial.finished >= max(self.window, trial.workers * 2):
+                elapsed = max(time.monotonic() - trial.started, 1e-6)
+                trial.throughput = trial.bytes / elapsed / 1024 / 1024
+                print(f"自动调优: 线程 {trial.workers}, 块大小 {trial.block_size // 1024}KB -> {trial.throughput:.1f} MB/s")
+                self._next(trial)
+
+    def _next(self, trial: Trial) -> None:
+        self.results.append(trial)
+        if self.best is None or trial.throughput > self.best.throughput:
+            self.best = trial
+        elif self.phase == 'workers' and trial.throughput < self.best.throughput * 0.95:
+            # 并发数继续增加已经没有收益
+            self.queue = []
+
+        if not self.queue and self.phase == 'workers':
+            self.phase = 'block'
+            self.queue = [(self.best.workers, b) for b in BLOCK_SIZES if b != self.best.block_size]
+
+        if self.queue:
+            self.trial = Trial(*self.queue.pop(0))
+        else:
+            self.phase = 'done'
+            self.trial = self.best
+            print(f"自动调优完成: 线程 {self.best.workers}, 块大小 {self.best.block_size // 1024}KB, "
+                  f"{self.best.throughput:.1f} MB/s")
+
+    def profile(self) -> Dict[str, float]:
+        """调优完成后的最优参数，用于保存"""
+        if not self.done:
+            raise RuntimeError("自动调优尚未完成")
+        best = self.best
+        return {
+            'workers': best.workers,
+            'block_size': best.block_size,
+            'throughput': round(best.throughput, 2),
+            'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
@@ -0,0 +1,111 @@
+import os
+import shutil
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from ncm.ncm import NCMFile
+from converter.converter import Converter
+
+# 快速指纹只读取加密音乐数据的开头、中间和结尾各一段
+SAMPLE_SIZE = 64 * 1024
+
+# Linux 下 FICLONE ioctl，用于在支持的文件系统 (btrfs/xfs) 上做 reflink
+FICLONE = 0x40049409
+
+LINK_REFLINK = 'reflink'
+LINK_HARD = 'hard'
+LINK_COPY = 'copy'
+LINK_METHODS = (LINK_REFLINK, LINK_HARD, LINK_COPY)
+
+def payload_fingerprint(ncm_file: NCMFile) -> str:
+    """计算加密音乐数据的快速指纹 (长度 + 首/中/尾采样的 BLAKE2b)"""
+    offset = ncm_file.music_offset
+    ncm_file.fd.seek(0, 2)
+    size = ncm_file.fd.tell() - offset
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(size.to_bytes(8, 'little'))
+    for start in sorted({0, max(0, size // 2 - SAMPLE_SIZE // 2), max(0, size - SAMPLE_SIZE)}):
+        ncm_file.fd.seek(offset + start)
+        digest.update(ncm_file.fd.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+def track_key(file_path: str) -> str:
+    """去重键：Meta.id + 加密音乐数据指纹，只解析文件头部"""
+    with NCMFile(file_path) as ncm_file:
+        ncm_file.parse_header()
+        converter = Converter(ncm_file)
+        converter.handle_meta()
+        music_id = converter.meta_data.id if converter.meta_data else 0
+        return f"{music_id}:{payload_fingerprint(ncm_file)}"
+
+def safe_track_key(file_path: str) -> Optional[str]:
+    """计算去重键，失败时返回 None (这样的文件照常单独转换)"""
+    try:
+        return track_key(file_path)
+    except Exception as e:
+        print(f"计算去重键失败 {file_path}: {str(e)}")
+        return None
+
+def link_output(src: str, dst: str, method: str = LINK_REFLINK) -> str:
+    """
+    把已转换的文件链接到新的位置，依次尝试 reflink、硬链接和复制，
+    返回实际使用的方式
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+
+    if method == LINK_REFLINK:
+        try:
+            import fcntl
+            with open(src, 'rb') as s, open(dst, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return LINK_REFLINK
+        except (ImportError, OSError):
+            if os.path.exists(dst):
+                os.remove(dst)
+            method = LINK_HARD
+
+    if method == LINK_HARD:
+        try:
+            os.link(src, dst)
+            return LINK_HARD
+        except OSError:
+            pass
+
+    shutil.copyfile(src, dst)
+    return LINK_COPY
+
+class DedupIndex:
+    """单次运行内的去重索引：去重键 -> 第一次转换得到的输出文件"""
+
+    def __init__(self):
+        self.entries: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def group(self, files: List[str], keys: List[Optional[str]]) -> List[List[str]]:
+        """按去重键分组并保持原有顺序，每组第一个文件负责转换"""
+        groups: Dict[str, List[str]] = {}
+        result: List[List[str]] = []
+        for file_path, key in zip(files, keys):
+            if key is None:
+                result.append([file_path])
+            elif key in groups:
+                groups[key].append(file_path)
+            else:
+                groups[key] = [file_path]
+                result.append(groups[key])
+        return result
+
+    def add(self, key: str, output_path: str) -> None:
+        """记录一个去重键对应的输出文件"""
+        with self.lock:
+            self.entries.setdefault(key, output_path)
+
+    def get(self, key: str) -> Optional[str]:
+        """已经转换过的输出文件，文件已被删除时返回 None"""
+        with self.lock:
+            output_path = self.entries.get(key)
+        return output_path if output_path and os.path.exists(output_path) else None
@@ -0,0 +1,159 @@
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# 设备类型
+DEVICE_HDD = 'hdd'          # 机械硬盘
+DEVICE_SSD = 'ssd'
+DEVICE_USB = 'usb'
+DEVICE_NETWORK = 'network'  # NFS/SMB/sshfs 等网络文件系统
+DEVICE_OTHER = 'other'      # tmpfs、overlay 等无法判断的设备
+DEVICE_KINDS = (DEVICE_HDD, DEVICE_SSD, DEVICE_USB, DEVICE_NETWORK, DEVICE_OTHER)
+
+# 每种设备默认的 I/O 并发数，0 表示不限制 (只受线程数限制)
+DEFAULT_LIMITS = {
+    DEVICE_HDD: 1,
+    DEVICE_SSD: 0,
+    DEVICE_USB: 2,
+    DEVICE_NETWORK: 2,
+    DEVICE_OTHER: 0,
+}
+
+NETWORK_FS = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', '9p', 'ceph', 'glusterfs', 'sshfs'}
+
+def device_of(path: str) -> int:
+    """路径所在设备的 st_dev，路径还不存在时 (输出文件) 使用最近的已存在的上级目录"""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise
+            path = parent
+
+def mount_types() -> Dict[int, str]:
+    """从 /proc/self/mountinfo 读取每个设备号对应的文件系统类型，其它平台返回空字典"""
+    types = {}
+    try:
+        with open('/proc/self/mountinfo', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                major, minor = fields[2].split(':')
+                # " - " 之后的第一个字段是文件系统类型
+                fstype = fields[fields.index('-') + 1]
+                types.setdefault(os.makedev(int(major), int(minor)), fstype)
+    except (OSError, ValueError, IndexError):
+        pass
+    return types
+
+def device_kind(dev: int, fstype: str = '') -> str:
+    """根据文件系统类型和 /sys/dev/block 判断设备类型"""
+    if fstype in NETWORK_FS or fstype.startswith('fuse.'):
+        return DEVICE_NETWORK
+
+    sys_path = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    if os.major(dev) == 0 or not os.path.exists(sys_path):
+        return DEVICE_OTHER
+    real = os.path.realpath(sys_path)
+    if '/usb' in real:
+        return DEVICE_USB
+    # 分区没有 queue 目录，使用所在磁盘的
+    for queue in (os.path.join(real, 'queue'), os.path.join(os.path.dirname(real), 'queue')):
+        try:
+            with open(os.path.join(queue, 'rotational')) as f:
+                return DEVICE_HDD if f.read().strip() == '1' else DEVICE_SSD
+        except OSError:
+            continue
+    return DEVICE_OTHER
+
+def parse_device_limit(spec: str) -> tuple:
+    """解析 "hdd=1" 或 "/mnt/nas=2"，返回 (设备类型或路径, 并发数)"""
+    key, sep, value = spec.rpartition('=')
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if not sep or not key or limit < 0:
+        raise ValueError(f"设备并发数格式应为 类型=N 或 路径=N: {spec}")
+    return key, limit
+
+class DeviceLimiter:
+    """
+    按设备限制 I/O 并发：每个设备 (st_dev) 一个信号量，读写共用。
+    机械硬盘、USB 和网络设备上的读取保持接近顺序，解密等 CPU 工作仍然并行
+    """
+
+    def __init__(self, specs: Optional[List[str]] = None):
+        self.kind_limits = dict(DEFAULT_LIMITS)
+        self.device_limits: Dict[int, int] = {}
+        for spec in specs or []:
+            key, limit = parse_device_limit(spec)
+            if key in DEVICE_KINDS:
+                self.kind_limits[key] = limit
+            else:
+                self.device_limits[device_of(key)] = limit
+
+        self.fstypes = mount_types()
+        self.lock = threading.Lock()
+        self.kinds: Dict[int, str] = {}
+        self.semaphores: Dict[int, Optional[threading.Semaphore]] = {}
+
+    def limit_of(self, dev: int) -> int:
+        if dev in self.device_limits:
+            return self.device_limits[dev]
+        return self.kind_limits[self.kinds[dev]]
+
+    def _semaphore(self, dev: int) -> Optional[threading.Semaphore]:
+        with self.lock:
+            if dev not in self.semaphores:
+                self.kinds[dev] = device_kind(dev, self.fstypes.get(dev, ''))
+                limit = self.limit_of(dev)
+                self.semaphores[dev] = threading.Semaphore(limit) if limit > 0 else None
+            return self.semaphores[dev]
+
+    def describe(self, paths: List[str]) -> List[str]:
+        """这些路径涉及的每个设备的类型和并发数，每个设备一行"""
+        lines = []
+        seen = set()
+        for path in sorted(paths):
+            dev = device_of(path)
+            if dev in seen:
+                continue
+            seen.add(dev)
+            self._semaphore(dev)
+            limit = self.limit_of(dev)
+            lines.append(f"设备 {os.major(dev)}:{os.minor(dev)} ({self.kinds[dev]}, {path}): "
+                         f"{'不限制并发' if limit <= 0 else f'I/O 并发 {limit}'}")
+        return lines
+
+    @contextmanager
+    def access(self, *paths: str) -> Iterator[None]:
+        """占用这些路径所在设备的 I/O 名额，同一设备只占用一次，按设备号顺序获取避免死锁"""
+        devices = sorted({device_of(path) for path in paths})
+        with ExitStack() as stack:
+            for dev in devices:
+                semaphore = self._semaphore(dev)
+                if semaphore:
+                    stack.enter_context(semaphore)
+            yield
+
+def interleave_by_device(files: List[str]) -> List[str]:
+    """按源文件所在设备分组后轮流排列，避免所有线程同时等待同一个慢设备"""
+    groups: Dict[int, List[str]] = {}
+    for file_path in files:
+        try:
+            dev = device_of(file_path)
+        except OSError:
+            dev = -1
+        groups.setdefault(dev, []).append(file_path)
+    if len(groups) <= 1:
+        return files
+
+    result = []
+    queues = list(groups.values())
+    for i in range(max(len(q) for q in queues)):
+        result.extend(q[i] for q in queues if i < len(q))
+    return result
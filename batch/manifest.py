@@ -0,0 +1,71 @@
+import json
+import hashlib
+import threading
+from typing import Any, BinaryIO, Optional
+
+# 可选的摘要算法，xxh* 需要安装 xxhash
+CHECKSUM_ALGORITHMS = ('blake2b', 'blake2s', 'sha256', 'sha1', 'md5', 'xxh64', 'xxh3_64', 'xxh128')
+
+# 输出摘要覆盖的范围：file 与最终文件一致，audio 只覆盖写入时的音频数据 (之后又原地添加了标签)
+SCOPE_FILE = 'file'
+SCOPE_AUDIO = 'audio'
+
+def new_digest(algorithm: str) -> Any:
+    """创建 hashlib 风格的摘要对象 (支持 update/hexdigest)"""
+    if algorithm.startswith('xxh'):
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError(f"{algorithm} 需要安装 xxhash: pip install xxhash")
+        return getattr(xxhash, algorithm)()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"不支持的摘要算法: {algorithm}")
+    return hashlib.new(algorithm)
+
+class HashingWriter:
+    """写入时顺带计算摘要的文件对象包装，不需要再读一遍输出文件"""
+
+    def __init__(self, sink: BinaryIO, digest: Any):
+        self.sink = sink
+        self.digest = digest
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        self.size += len(data)
+        return self.sink.write(data)
+
+class Manifest:
+    """
+    每次运行的校验和清单，每行一个 JSON 对象，记录源文件和输出文件的大小和摘要，
+    供下游的去重和同步工具直接使用
+    """
+
+    def __init__(self, path: str, algorithm: str):
+        self.path = path
+        self.algorithm = algorithm
+        self.lock = threading.Lock()
+        self.count = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def record(self, source: str, source_size: int, source_digest: Optional[Any],
+               output: str, output_size: int, output_digest: Optional[Any],
+               scope: str = SCOPE_FILE) -> None:
+        """写入一条记录，读取过程中发生回退时源文件摘要为 null"""
+        line = json.dumps({
+            'algorithm': self.algorithm,
+            'source': source,
+            'source_size': source_size,
+            'source_digest': source_digest.hexdigest() if source_digest else None,
+            'output': output,
+            'output_size': output_size,
+            'output_digest': output_digest.hexdigest() if output_digest else None,
+            'scope': scope,
+        }, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,112 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+def current_rss() -> int:
+    """当前进程的常驻内存 (字节)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # 不支持 /proc 的平台只能拿到历史峰值 (Linux 单位 KB，macOS 单位字节)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if os.uname().sysname == 'Darwin' else rss * 1024
+    except (ImportError, OSError):
+        return 0
+
+def format_size(size: float) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+class MemoryTracker:
+    """
+    内存统计：后台线程定时采样 RSS，记录整体峰值以及每个阶段活跃期间的峰值 (实测)；
+    同时按文件和阶段累计登记的缓冲区大小 (按处理路径估算，不是逐个文件的实测值)
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.peak_rss = current_rss()
+        self.active: Dict[str, int] = {}
+        self.stage_peak_rss: Dict[str, int] = {}
+        self.held: Dict[str, int] = {}
+        self.stage_peak_held: Dict[str, int] = {}
+        self.file_peaks: Dict[str, int] = {}
+
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._sample, name='memory-sampler', daemon=True)
+        self.thread.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            with self.lock:
+                self.peak_rss = max(self.peak_rss, rss)
+                for stage, count in self.active.items():
+                    if count:
+                        self.stage_peak_rss[stage] = max(self.stage_peak_rss.get(stage, 0), rss)
+
+    @contextmanager
+    def track(self, stage: str, file_path: str, nbytes: int):
+        """登记某个文件在某个阶段预计持有 nbytes 的缓冲区"""
+        with self.lock:
+            self.active[stage] = self.active.get(stage, 0) + 1
+            self.held[stage] = self.held.get(stage, 0) + nbytes
+            self.stage_peak_held[stage] = max(self.stage_peak_held.get(stage, 0), self.held[stage])
+            self.file_peaks[file_path] = max(self.file_peaks.get(file_path, 0), nbytes)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active[stage] -= 1
+                self.held[stage] -= nbytes
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.thread.join()
+
+    def summary(self, top: int = 5) -> List[str]:
+        """运行结束时的内存报告，RSS 是采样得到的实测值，缓冲区大小是估算值"""
+        lines = [f"进程内存峰值 (RSS 采样): {format_size(self.peak_rss)}"]
+        for stage in self.stage_peak_held:
+            lines.append(
+                f"  {stage}: 估算缓冲区峰值 {format_size(self.stage_peak_held[stage])}, "
+                f"阶段活跃期间 RSS 峰值 {format_size(self.stage_peak_rss.get(stage, 0))}"
+            )
+        largest = sorted(self.file_peaks.items(), key=lambda item: item[1], reverse=True)[:top]
+        if largest:
+            lines.append("  估算缓冲区最大的文件:")
+            lines.extend(f"    {format_size(size)}  {path}" for path, size in largest)
+        return lines
+
+class MemoryBudget:
+    """全局内存上限：按预计缓冲区大小登记，超过上限时改走低内存路径或等待"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """不等待地登记，超出上限时返回 False"""
+        with self.cond:
+            if self.used + nbytes > self.limit:
+                return False
+            self.used += nbytes
+            return True
+
+    def acquire(self, nbytes: int) -> None:
+        """等待直到有足够空间；单个任务超过上限时只在没有其它任务时执行"""
+        with self.cond:
+            while self.used and self.used + nbytes > self.limit:
+                self.cond.wait()
+            self.used += nbytes
+
+    def release(self, nbytes: int) -> None:
+        with self.cond:
+            self.used -= nbytes
+            self.cond.notify_all()
@@ -0,0 +1,31 @@
+from typing import Dict, List
+
+def make_batches(files: List[str], sizes: Dict[str, int], max_bytes: int,
+                 min_batches: int = 1) -> List[List[str]]:
+    """
+    按总字节数把小文件合并成批，每批作为一个线程池任务依次转换，
+    分摊提交任务和创建解密对象等每个文件固定的开销。
+    不小于 max_bytes 的文件单独成批；为了让所有线程都有活干，
+    批大小还会限制在小文件总量的 1/min_batches 以内。保持原有顺序。
+    """
+    if max_bytes <= 0:
+        return [[f] for f in files]
+
+    small_total = sum(sizes[f] for f in files if sizes[f] < max_bytes)
+    limit = max(1, min(max_bytes, small_total // max(1, min_batches)))
+
+    batches = []
+    current: List[str] = []
+    current_bytes = 0
+    for file_path in files:
+        if sizes[file_path] >= max_bytes:
+            batches.append([file_path])
+            continue
+        current.append(file_path)
+        current_bytes += sizes[file_path]
+        if current_bytes >= limit:
+            batches.append(current)
+            current, current_bytes = [], 0
+    if current:
+        batches.append(current)
+    return batches
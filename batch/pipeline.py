@@ -0,0 +1,108 @@
+import time
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+# 通知工作线程退出的标记
+_STOP = object()
+
+class Stage:
+    """
+    流水线中的一个阶段：独立大小的工作线程池，前面是一个有界队列。
+    队列满时上一阶段会阻塞，从而限制在途的数据量。
+    fn 返回 None 表示该任务到此结束 (失败或不需要后续阶段)。
+    任务离开流水线 (失败或完成最后一个阶段) 时调用 on_done。
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int, queue_size: int):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.next: Optional['Stage'] = None
+        self.on_done: Optional[Callable[[Any], None]] = None
+        self.threads: List[threading.Thread] = []
+
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0  # 所有线程处理任务的累计时间
+        self.waiting = 0.0  # 向下一阶段提交时被阻塞的累计时间
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, item: Any) -> None:
+        self.queue.put(item)
+
+    def stop(self) -> None:
+        """等待队列中的任务处理完后结束所有线程"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+
+            start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                print(f"{self.name} 阶段失败 {item}: {str(e)}")
+                result = None
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                self.busy += elapsed
+                if result is None:
+                    self.failed += 1
+                else:
+                    self.processed += 1
+
+            if result is not None and self.next:
+                start = time.perf_counter()
+                self.next.put(result)
+                with self.lock:
+                    self.waiting += time.perf_counter() - start
+            elif self.on_done:
+                self.on_done(item)
+
+class Pipeline:
+    """按顺序连接的多个阶段，各阶段并行处理不同的文件"""
+
+    def __init__(self, stages: List[Stage], on_done: Optional[Callable[[Any], None]] = None):
+        self.stages = stages
+        for current, following in zip(stages, stages[1:]):
+            current.next = following
+        for stage in stages:
+            stage.on_done = on_done
+
+    def run(self, items: Iterable[Any]) -> float:
+        """把所有任务送入第一个阶段并等待全部阶段处理完成，返回总耗时"""
+        start = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+        for item in items:
+            self.stages[0].put(item)
+        # 前一阶段全部结束后再结束下一阶段，保证所有任务都流过整条流水线
+        for stage in self.stages:
+            stage.stop()
+        return time.perf_counter() - start
+
+    def summary(self, elapsed: float) -> List[str]:
+        """各阶段的处理数量和线程利用率，用于调整每个阶段的线程数"""
+        lines = []
+        for stage in self.stages:
+            utilization = stage.busy / (elapsed * stage.workers) * 100 if elapsed > 0 else 0
+            lines.append(
+                f"{stage.name}: 线程 {stage.workers}, 完成 {stage.processed}, 失败 {stage.failed}, "
+                f"利用率 {utilization:.0f}%, 等待下游 {stage.waiting:.1f}s"
+            )
+        return lines
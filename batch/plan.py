@@ -0,0 +1,150 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from ncm.ncm import NCMFile
+from path.path_utils import file_size
+from tag.base import PADDING_RESERVE
+from tag.cover import COVER_EMBED, COVER_FOLDER, DEFAULT_SIZES
+
+# 估算缩放后封面 (JPEG) 大小时假设的每像素字节数
+JPEG_BYTES_PER_PIXEL = 0.15
+
+# 校准解密吞吐量使用的数据量
+CALIBRATE_SIZE = 16 * 1024 * 1024
+# 估算时假设每次封面下载的耗时 (秒)
+COVER_FETCH_SECONDS = 0.5
+
+@dataclass
+class PlanEntry:
+    """只读取文件头得到的单个文件信息"""
+    path: str
+    size: int
+    payload: int
+    format: str
+    cover_size: int
+    cover_url: str = ''
+    album: str = ''
+    error: str = ''
+
+    @property
+    def needs_fetch(self) -> bool:
+        """文件内没有封面、需要从网络下载"""
+        return not self.cover_size and bool(self.cover_url)
+
+def plan_file(path: str) -> PlanEntry:
+    """只解析文件头和元数据，不解密音乐数据"""
+    from converter.converter import Converter
+
+    try:
+        with NCMFile(path) as ncm_file:
+            ncm_file.parse_header()
+            size = file_size(path)
+            converter = Converter(ncm_file)
+            converter.handle_meta()
+            meta = converter.meta_data
+            return PlanEntry(
+                path=path,
+                size=size,
+                payload=size - ncm_file.music_offset,
+                format=meta.format.lower() or 'unknown',
+                cover_size=ncm_file.cover.length,
+                cover_url=meta.album.cover_url if meta.album else '',
+                album=meta.album.name if meta.album else '',
+            )
+    except Exception as e:
+        return PlanEntry(path=path, size=0, payload=0, format='', cover_size=0, error=str(e))
+
+def measure_throughput(size: int = CALIBRATE_SIZE) -> float:
+    """在本机上测量单线程解密吞吐量 (字节/秒)，已包含 JIT 预热"""
+    import numpy as np
+    from converter.cipher import process_chunk, warmup
+
+    warmup()
+    box = np.random.default_rng(0).permutation(256).astype(np.uint8)
+    data = np.zeros(size, dtype=np.uint8)
+    start = time.perf_counter()
+    process_chunk(data, box)
+    return size / max(time.perf_counter() - start, 1e-9)
+
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+class Plan:
+    """转换前的开销估算：数据量、格式分布、输出空间、封面下载和预计耗时"""
+
+    def __init__(self, entries: List[PlanEntry]):
+        self.entries = [e for e in entries if not e.error]
+        self.errors = [e for e in entries if e.error]
+
+    @classmethod
+    def from_files(cls, files: List[str], max_workers: int = 4) -> 'Plan':
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return cls(list(pool.map(plan_file, files)))
+
+    @property
+    def payload(self) -> int:
+        return sum(e.payload for e in self.entries)
+
+    def output_size(self, tagged: bool = True, cover_policy: str = COVER_EMBED, cover_size: int = 0) -> int:
+        """
+        预计输出大小：解密后的音频与加密数据等长；添加标签时每个文件另有预留的填充块和封面。
+        resize/thumb 按缩放后的尺寸估算封面，folder 不内嵌而是每张专辑写一个封面文件
+        """
+        size = self.payload
+        if not tagged:
+            return size
+        size += PADDING_RESERVE * len(self.entries)
+
+        max_size = cover_size or DEFAULT_SIZES.get(cover_policy, 0)
+        limit = int(max_size * max_size * JPEG_BYTES_PER_PIXEL) if max_size and cover_policy != COVER_EMBED else 0
+
+        def scaled(entry: PlanEntry) -> int:
+            return min(entry.cover_size, limit) if limit else entry.cover_size
+
+        if cover_policy == COVER_FOLDER:
+            albums = {}
+            for e in self.entries:
+                albums.setdefault(e.album or e.path, scaled(e))
+            return size + sum(albums.values())
+        return size + sum(scaled(e) for e in self.entries)
+
+    def cover_fetches(self) -> List[PlanEntry]:
+        return [e for e in self.entries if e.needs_fetch]
+
+    def summary(self, threads: int, throughput: Optional[float] = None, tagged: bool = True,
+                cover_policy: str = COVER_EMBED, cover_size: int = 0, top: int = 5) -> List[str]:
+        mb = 1024 * 1024
+        formats = Counter(e.format for e in self.entries)
+        fetches = self.cover_fetches()
+        # 封面按 URL 缓存，同一张封面只下载一次
+        urls = {e.cover_url for e in fetches}
+        lines = [
+            f"文件: {len(self.entries)} 个, 总大小 {sum(e.size for e in self.entries) / mb:.1f} MB, "
+            f"音乐数据 {self.payload / mb:.1f} MB",
+            "格式: " + ", ".join(f"{fmt} {count}" for fmt, count in formats.most_common()),
+            f"预计输出空间 (估算): {self.output_size(tagged, cover_policy, cover_size) / mb:.1f} MB",
+            f"需要下载封面: {len(fetches)} 个文件, {len(urls)} 张不同的封面",
+        ]
+
+        if fetches:
+            hosts = Counter(urlparse(e.cover_url).netloc for e in fetches)
+            lines.append("  封面下载来源: " + ", ".join(f"{host} {count}" for host, count in hosts.most_common(top)))
+            albums = Counter(e.album or e.cover_url for e in fetches)
+            lines.append("  缺少封面最多的专辑: " + ", ".join(f"{album} ({count})" for album, count in albums.most_common(top)))
+
+        if throughput:
+            decrypt = self.payload / (throughput * max(1, threads))
+            fetch = len(urls) * COVER_FETCH_SECONDS / max(1, threads)
+            lines.append(f"解密吞吐量 (单线程): {throughput / mb:.0f} MB/s")
+            lines.append(f"预计耗时: {format_seconds(decrypt + fetch)} "
+                         f"(解密 {format_seconds(decrypt)}, 封面下载约 {format_seconds(fetch)}，不含磁盘 I/O)")
+
+        for e in self.errors:
+            lines.append(f"无法读取 {e.path}: {e.error}")
+        return lines
@@ -0,0 +1,33 @@
+import os
+import hashlib
+from typing import List, Optional, TextIO, Tuple
+
+def read_file_list(stream: TextIO, null_delimited: bool = False) -> List[str]:
+    """读取文件列表，每行一个路径或者以 NUL 分隔，忽略空项"""
+    data = stream.read()
+    entries = data.split('\0') if null_delimited else data.splitlines()
+    return [e for e in entries if e.strip()]
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """解析 "i/N" 形式的分片参数，i 从 0 开始"""
+    try:
+        index, count = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"分片格式应为 i/N: {spec}")
+    if count <= 0 or not 0 <= index < count:
+        raise ValueError(f"分片编号超出范围: {spec}")
+    return index, count
+
+def shard_key(path: str, root: Optional[str] = None) -> str:
+    """
+    分片使用的键：相对于 root 的路径，统一使用 / 分隔。
+    不同机器挂载点相同或使用相对路径时，同一个文件得到相同的键。
+    """
+    if root:
+        path = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    return path.replace(os.sep, '/')
+
+def shard_of(key: str, count: int) -> int:
+    """根据键的哈希确定分片编号，与进程和机器无关"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
@@ -0,0 +1,190 @@
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# inotify 事件掩码 (见 <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+class Inotify:
+    """基于 ctypes 的最小 inotify 封装，只在 Linux 上可用"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("找不到 libc")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"无法监听目录: {path}")
+        return wd
+
+    def read_events(self, timeout: float) -> List[Tuple[int, int, str]]:
+        """等待并读取事件，返回 (wd, mask, name) 列表"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class Watcher:
+    """
+    监听输入目录中新出现的 NCM 文件。优先使用 inotify，不可用时退回定时轮询。
+    文件大小在 settle 秒内不再变化才认为下载完成。
+    """
+
+    def __init__(self, paths: List[str], depth: int = 5, settle: float = 2.0,
+                 poll_interval: float = 1.0, use_inotify: bool = True):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.depth = depth
+        self.settle = settle
+        self.poll_interval = poll_interval
+
+        # 等待稳定的文件: 路径 -> (大小, 修改时间, 最后一次变化的时间)
+        self.pending: Dict[str, Tuple[int, float, float]] = {}
+        # 已经处理过的文件状态，重新扫描时避免重复转换
+        self.seen: Dict[str, Tuple[int, float]] = {}
+        # inotify 监听描述符 -> (目录, 剩余深度)
+        self.watches: Dict[int, Tuple[str, int]] = {}
+
+        self.inotify: Optional[Inotify] = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"inotify 不可用，使用轮询模式: {str(e)}")
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self.inotify else 'poll'
+
+    def _add_candidate(self, path: str) -> None:
+        if path.lower().endswith('.ncm') and path not in self.pending:
+            self.pending[path] = (-1, 0.0, time.monotonic())
+
+    def _scan(self, directory: str, depth: int, watch: bool) -> None:
+        """扫描目录 (只在启动、新建目录或事件溢出时调用)，必要时添加监听"""
+        if depth <= 0:
+            return
+        if watch and self.inotify:
+            try:
+                self.watches[self.inotify.add_watch(directory)] = (directory, depth)
+            except OSError as e:
+                print(f"监听目录失败 {directory}: {str(e)}")
+        try:
+            for entry in os.scandir(directory):
+                if entry.is_file():
+                    self._poll_file(entry.path)
+                elif entry.is_dir() and depth > 1:
+                    self._scan(entry.path, depth - 1, watch)
+        except OSError as e:
+            print(f"查找目录失败 {directory}: {str(e)}")
+
+    def _poll_file(self, path: str) -> None:
+        """只把新出现或发生变化的文件加入等待队列"""
+        if not path.lower().endswith('.ncm'):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if self.seen.get(path) != (st.st_size, st.st_mtime):
+            self._add_candidate(path)
+
+    def _handle_events(self, timeout: float) -> None:
+        for wd, mask, name in self.inotify.read_events(timeout):
+            if mask & IN_Q_OVERFLOW:
+                print("inotify 事件队列溢出，重新扫描一次")
+                for path in self.paths:
+                    self._scan(path, self.depth, watch=False)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches or not name:
+                continue
+
+            directory, depth = self.watches[wd]
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                # 新建或移入的目录：添加监听并处理其中已有的文件
+                if mask & (IN_CREATE | IN_MOVED_TO) and depth > 1:
+                    self._scan(path, depth - 1, watch=True)
+            else:
+                self._add_candidate(path)
+
+    def _collect_ready(self) -> List[str]:
+        """检查等待中的文件，返回大小已经稳定的文件"""
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime, changed) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                self.pending[path] = (st.st_size, st.st_mtime, now)
+            elif now - changed >= self.settle and st.st_size > 0:
+                del self.pending[path]
+                self.seen[path] = (st.st_size, st.st_mtime)
+                ready.append(path)
+        return ready
+
+    def ready_files(self) -> Iterator[str]:
+        """持续返回下载完成的 NCM 文件，启动时处理一次已有文件"""
+        for path in self.paths:
+            if os.path.isfile(path):
+                self._poll_file(path)
+            else:
+                self._scan(path, self.depth, watch=True)
+
+        tick = min(self.poll_interval, self.settle / 2 or self.poll_interval)
+        try:
+            while True:
+                if self.inotify:
+                    self._handle_events(tick)
+                else:
+                    time.sleep(self.poll_interval)
+                    for path in self.paths:
+                        if os.path.isdir(path):
+                            self._scan(path, self.depth, watch=False)
+                yield from self._collect_ready()
+        finally:
+            if self.inotify:
+                self.inotify.close()
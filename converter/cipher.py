@@ -0,0 +1,35 @@
+from numba import njit
+import numpy as np
+
+# nogil: 解密时释放 GIL，其它线程的 I/O 和标签处理可以同时进行
+@njit(nogil=True)
+def process_chunk(chunk: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """使用 Numba 加速的数据块处理"""
+    result = np.empty_like(chunk)
+    for i in range(len(chunk)):
+        j = (i + 1) & 0xff
+        result[i] = chunk[i] ^ box[(box[j] + box[(box[j] + j) & 0xff]) & 0xff]
+    return result
+
+@njit(nogil=True)
+def build_box(key: np.ndarray) -> np.ndarray:
+    """使用 Numba 加速的密钥盒构建，与 utils.build_key_box 结果相同"""
+    box = np.arange(256).astype(np.uint8)
+    key_len = len(key)
+    last_byte = 0
+    for i in range(256):
+        c = (box[i] + last_byte + key[i % key_len]) & 0xff
+        box[i], box[c] = box[c], box[i]
+        last_byte = c
+    return box
+
+def warmup() -> None:
+    """
+    提前触发 Numba JIT 编译，避免第一个文件承担编译时间。
+    Numba 对可写数组和只读数组 (np.frombuffer(bytes)) 分别编译，两种都要预热
+    """
+    readonly = np.frombuffer(bytes(256), dtype=np.uint8)
+    for key in (np.arange(16, dtype=np.uint8), readonly[:16]):
+        box = build_box(key)
+    for data in (np.zeros(256, dtype=np.uint8), readonly):
+        process_chunk(data, box)
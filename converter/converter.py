@@ -1,18 +1,22 @@
 import json
 import base64
-import math
-from io import BytesIO
 from dataclasses import dataclass
-from typing import List, Optional
-import numpy as np
+from typing import TYPE_CHECKING, List, Optional, Iterator, BinaryIO
 
-from .utils import decrypt_aes128, build_key_box, process_chunk
+from .utils import decrypt_aes128, sniff_format
 from ncm.ncm import NCMFile
 
+if TYPE_CHECKING:
+    import numpy as np
+
 # 密钥常量
 AES_CORE_KEY = bytes([0x68, 0x7A, 0x48, 0x52, 0x41, 0x6D, 0x73, 0x6F, 0x35, 0x6B, 0x49, 0x6E, 0x62, 0x61, 0x78, 0x57])
 AES_MODIFY_KEY = bytes([0x23, 0x31, 0x34, 0x6C, 0x6A, 0x6B, 0x5F, 0x21, 0x5C, 0x5D, 0x26, 0x30, 0x55, 0x3C, 0x27, 0x28])
 
+# 密钥和元数据逐字节异或的查找表，用 bytes.translate 代替逐字节的生成器
+KEY_XOR_TABLE = bytes(b ^ 0x64 for b in range(256))
+META_XOR_TABLE = bytes(b ^ 0x63 for b in range(256))
+
 @dataclass
 class Artist:
     name: str
@@ -62,10 +66,16 @@ class Converter:
         self.key_data: Optional[bytes] = None
         self.meta_data: Optional[Meta] = None
         self.music_data: Optional[bytes] = None
+        # detect_format 预先解密的第一块数据和剩余数据块
+        self._head: Optional[bytes] = None
+        self._rest: Optional[Iterator[bytes]] = None
+        # 解密块大小，必须是 256 的倍数以保持密钥流对齐
+        self.chunk_size = 0x8000
+        self._box: Optional['np.ndarray'] = None
         
     def handle_key(self) -> None:
         """处理密钥数据"""
-        tmp = bytes(b ^ 0x64 for b in self.ncm_file.key.detail)
+        tmp = bytes(self.ncm_file.key.detail).translate(KEY_XOR_TABLE)
         
         decrypted_data = decrypt_aes128(AES_CORE_KEY, tmp)
         self.key_data = decrypted_data  # 不再切片，保留完整密钥
@@ -73,19 +83,16 @@ class Converter:
     def handle_meta(self) -> None:
         """处理元数据"""
         if self.ncm_file.meta.length <= 0:
-            # 处理没有元数据的情况
-            format_type = "flac"
-            if self.ncm_file.fd.tell() < 16 * 1024 * 1024:  # 16MB
-                format_type = "mp3"
+            # 处理没有元数据的情况，格式由 detect_format 从音频数据中判断
             self.meta_data = Meta(
                 id=0, name="", album=None, 
                 artists=[], bit_rate=0, 
-                duration=0, format=format_type
+                duration=0, format=""
             )
             return
 
         # 解密元数据
-        tmp = bytes(b ^ 0x63 for b in self.ncm_file.meta.detail)
+        tmp = bytes(self.ncm_file.meta.detail).translate(META_XOR_TABLE)
         
         # 跳过 "163 key(Don't modify):" (22字节)
         b64_data = tmp[22:]
@@ -113,33 +120,103 @@ class Converter:
             comment=tmp.decode('utf-8', errors='ignore')
         )
 
-    def handle_music(self) -> None:
-        """处理音乐数据"""
-        if not self.key_data:
-            self.handle_key()
-            
-        # 使用完整密钥的后半部分构建密钥盒
-        box = np.array(build_key_box(self.key_data[17:]), dtype=np.uint8)
-        n = 0x8000  # 32KB 缓冲区
-        result = bytearray()
-        
-        # 将音乐数据转换为 numpy 数组进行处理
-        data = BytesIO(self.ncm_file.music.detail)
-        
-        while True:
-            chunk = data.read(n)
-            if not chunk:
-                break
-            
+    def _build_box(self) -> 'np.ndarray':
+        """使用完整密钥的后半部分构建密钥盒，同一个文件只构建一次"""
+        import numpy as np
+        from .cipher import build_box
+
+        if self._box is None:
+            if not self.key_data:
+                self.handle_key()
+            self._box = build_box(np.frombuffer(self.key_data[17:], dtype=np.uint8))
+        return self._box
+
+    def key_stream(self) -> bytes:
+        """
+        返回 256 字节的密钥流。第 i 个字节的密钥只取决于 i % 256，
+        所以可以用它随机解密任意位置的少量数据。
+        """
+        import numpy as np
+        from .cipher import process_chunk
+
+        return process_chunk(np.zeros(256, dtype=np.uint8), self._build_box()).tobytes()
+
+    def _decrypt_chunks(self) -> Iterator[bytes]:
+        """
+        逐块解密音乐数据。已经读入内存的数据直接切片处理，
+        否则从 NCMFile 的数据源流式读取。
+        """
+        # numpy/numba 只在真正解密音乐数据时导入
+        import numpy as np
+        from .cipher import process_chunk
+
+        box = self._build_box()
+        n = self.chunk_size
+
+        if self.ncm_file.music.length > 0:
+            view = memoryview(self.ncm_file.music.detail)
+            chunks = (view[i:i + n] for i in range(0, len(view), n))
+        else:
+            chunks = self.ncm_file.iter_music(n)
+
+        for chunk in chunks:
             # 使用 Numba 加速的函数处理数据块
             chunk_array = np.frombuffer(chunk, dtype=np.uint8)
-            processed = process_chunk(chunk_array, box)
-            result.extend(processed)
-        
-        self.music_data = bytes(result)
+            yield process_chunk(chunk_array, box).tobytes()
+
+    def iter_music(self) -> Iterator[bytes]:
+        """逐块返回解密后的音乐数据，会先返回 detect_format 已经解密的第一块"""
+        if self._head is None:
+            yield from self._decrypt_chunks()
+            return
+
+        head, rest = self._head, self._rest
+        self._head = self._rest = None
+        yield head
+        yield from rest
+
+    def detect_format(self) -> str:
+        """
+        根据解密后的第一块数据判断输出格式 (fLaC / ID3 / MPEG 帧同步)，
+        判断不出时才使用元数据中的格式。结果会写回 meta_data.format。
+        只解密第一块，后续的 iter_music 不会重复读取。
+        """
+        if self.meta_data is None:
+            self.handle_meta()
+
+        if self._head is None:
+            self._rest = self._decrypt_chunks()
+            self._head = next(self._rest, b'')
+
+        format_type = sniff_format(self._head)
+        if not format_type:
+            declared = self.meta_data.format.lower()
+            format_type = declared if declared in ('flac', 'mp3') else 'mp3'
+        elif self.meta_data.format and self.meta_data.format.lower() != format_type:
+            print(f"元数据格式 {self.meta_data.format} 与实际数据不符，使用 {format_type}")
+
+        self.meta_data.format = format_type
+        return format_type
+
+    def handle_music(self) -> None:
+        """处理音乐数据"""
+        self.music_data = b''.join(self.iter_music())
+
+    def write_music(self, sink: BinaryIO) -> int:
+        """将解密后的音乐数据写入任意可写的文件对象，返回写入的字节数"""
+        if self.music_data is not None:
+            sink.write(self.music_data)
+            return len(self.music_data)
+
+        written = 0
+        for chunk in self.iter_music():
+            sink.write(chunk)
+            written += len(chunk)
+        return written
         
     def handle_all(self) -> None:
         """处理所有数据"""
         self.handle_key()
         self.handle_meta()
+        self.detect_format()
         self.handle_music()
@@ -1,12 +1,25 @@
+import threading
+from typing import Optional
 from Crypto.Cipher import AES
-from numba import njit
-import numpy as np
+
+# 每个线程缓存的 AES 对象，批量处理时不用为每个文件重新创建
+_local = threading.local()
+
+def get_cipher(key: bytes):
+    """返回当前线程中该密钥的 AES-128 ECB 对象 (ECB 没有状态，可以重复使用)"""
+    ciphers = getattr(_local, 'ciphers', None)
+    if ciphers is None:
+        ciphers = _local.ciphers = {}
+    cipher = ciphers.get(key)
+    if cipher is None:
+        cipher = ciphers[key] = AES.new(key, AES.MODE_ECB)
+    return cipher
 
 def decrypt_aes128(key: bytes, data: bytes) -> bytes:
     """AES-128 ECB模式解密"""
     # 确保数据长度是16的倍数
     data = data[:(len(data) // AES.block_size) * AES.block_size]
-    cipher = AES.new(key, AES.MODE_ECB)
+    cipher = get_cipher(key)
     decrypted_data = cipher.decrypt(data)
     
     # 处理PKCS7 padding
@@ -31,11 +44,43 @@ def build_key_box(key: bytes) -> bytearray:
     
     return box
 
-@njit
-def process_chunk(chunk: np.ndarray, box: np.ndarray) -> np.ndarray:
-    """使用 Numba 加速的数据块处理"""
-    result = np.empty_like(chunk)
-    for i in range(len(chunk)):
-        j = (i + 1) & 0xff
-        result[i] = chunk[i] ^ box[(box[j] + box[(box[j] + j) & 0xff]) & 0xff]
-    return result
+def id3_size(data: bytes) -> int:
+    """ID3v2 标签的总长度 (含10字节头部)，不是 ID3 标签时返回 0"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7f)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def is_mpeg_frame_sync(data: bytes) -> bool:
+    """检查是否为 MPEG 音频帧同步字 (11 位 1，且版本和层不是保留值)"""
+    if len(data) < 2 or data[0] != 0xff or data[1] & 0xe0 != 0xe0:
+        return False
+    return (data[1] >> 3) & 0x03 != 0x01 and (data[1] >> 1) & 0x03 != 0x00
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """根据解密后的开头数据判断音频格式，无法判断时返回 None"""
+    if head[:4] == b'fLaC':
+        return 'flac'
+
+    size = id3_size(head)
+    if size:
+        # FLAC 文件也可能带有 ID3 头部，能看到后面的数据时再确认一次
+        if head[size:size + 4] == b'fLaC':
+            return 'flac'
+        if is_mpeg_frame_sync(head[size:]):
+            return 'mp3'
+        # 标签过长 (比如内嵌大封面) 时交给元数据判断
+        return None
+
+    if is_mpeg_frame_sync(head):
+        return 'mp3'
+    return None
+
+def xor_stream(data: bytes, offset: int, key_stream: bytes) -> bytes:
+    """用 256 字节周期的密钥流解密从 offset 开始的一段数据"""
+    start = offset % len(key_stream)
+    stream = (key_stream[start:] + key_stream * (len(data) // len(key_stream) + 1))[:len(data)]
+    return bytes(a ^ b for a, b in zip(data, stream))
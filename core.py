@@ -1,38 +1,131 @@
 #!/usr/bin/env python3
 import argparse
+import importlib
 import os
+import posixpath
+import sys
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Optional
+from io import BytesIO
+from contextlib import redirect_stdout, contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, BinaryIO, Tuple
 from pathlib import Path
 
-from ncm.ncm import NCMFile
-from converter.converter import Converter
-from tag.tag import create_tagger, tag_audio_file
-from path.path_utils import clean, join, base, dir_path
+from ncm.ncm import NCMFile, NCMSource
+from ncm.io import IOPolicy, PolicyWriter, IO_POLICIES, IO_DEFAULT, parse_size
+from converter.converter import Converter, Meta
+from tag.sidecar import write_sidecar
+from tag.cover import CoverCache, COVER_POLICIES, COVER_EMBED, cover_file_name
+from path.path_utils import clean, join, base, dir_path, ext, file_size
+from verify.verify import verify_output, verify_files
+from batch.shard import read_file_list, parse_shard, shard_key, shard_of
+from batch.pipeline import Stage, Pipeline
+from batch.archive import ArchiveWriter, ARCHIVE_FORMATS, ARCHIVE_TAR
+from batch.autotune import Autotuner, load_profile, save_profile, PROFILE_PATH
+from batch.dedup import DedupIndex, safe_track_key, link_output, LINK_METHODS, LINK_REFLINK
+from batch.memory import MemoryBudget, MemoryTracker, format_size
+from batch.microbatch import make_batches
+from batch.device import DeviceLimiter, interleave_by_device, parse_device_limit
+from batch.manifest import Manifest, HashingWriter, new_digest, CHECKSUM_ALGORITHMS, SCOPE_FILE, SCOPE_AUDIO
+
+# 流水线模式
+MODE_FULL = 'full'        # 解密 + 写入 + 添加标签
+MODE_DECRYPT = 'decrypt'  # 只解密音频，不添加标签
+MODE_META = 'meta'        # 只导出元数据和封面 (JSON/图片旁路文件)
+MODE_VERIFY = 'verify'    # 只校验已有的输出文件
+MODE_RETAG = 'retag'      # 只读取NCM文件头，原地更新已有输出文件的标签
+MODES = (MODE_FULL, MODE_DECRYPT, MODE_META, MODE_VERIFY, MODE_RETAG)
+
+@dataclass
+class ConvertJob:
+    """分阶段流水线中在各阶段之间传递的单个文件的状态"""
+    file_path: str
+    output_dir: str
+    ncm_file: Optional[NCMFile] = None
+    converter: Optional[Converter] = None
+    output_path: str = ''
+    reserved: int = 0  # 在内存上限中登记的字节数
+    digest: Any = None  # 输出文件的摘要
+    scope: str = SCOPE_FILE
+
+    def __str__(self) -> str:
+        return self.file_path
 
 class NCMConverter:
-    def __init__(self):
+    def __init__(self, verify: bool = False):
         self.version = "0.1.0"
+        # 转换后校验输出文件结构，校验失败视为转换失败
+        self.verify = verify
+        # 读取缓冲区和解密块大小，可由自动调优调整
+        self.buffer_size = 8192
+        self.chunk_size = 0x8000
         self.thread_pool: Optional[ThreadPoolExecutor] = None
+        self.dedup_index = DedupIndex()
+        self.cover_cache = CoverCache()
+        self.io_policy = IOPolicy()
+        self.memory_budget: Optional[MemoryBudget] = None
+        self.memory_tracker: Optional[MemoryTracker] = None
+        # 写入时顺带计算的校验和，为空时不计算
+        self.checksum = ''
+        self.manifest: Optional[Manifest] = None
+        # 去重时记录已转换输出的摘要，链接得到的重复文件沿用同一条摘要写入清单
+        self.output_checksums: Optional[Dict[str, Tuple[Any, str, int]]] = None
+        # 按设备限制 I/O 并发，为空时只受线程数限制
+        self.device_limiter: Optional[DeviceLimiter] = None
     
-    def convert_file(self, file_path: str, output_dir: str, add_tags: bool = True) -> None:
-        """转换单个NCM文件"""
+    def convert_file(self, file_path: str, output_dir: str, add_tags: bool = True,
+                     mode: str = MODE_FULL, block_size: int = 0) -> Optional[str]:
+        """
+        转换单个NCM文件，返回输出文件路径，失败时返回 None。
+        block_size 不为 0 时代替默认的读取缓冲区和解密块大小 (自动调优时按任务指定)
+        """
+        buffer_size = block_size or self.buffer_size
+        chunk_size = block_size or self.chunk_size
         try:
             print(f"开始转换: {file_path}")
             
+            # 处理输出路径
+            if not output_dir:
+                output_dir = dir_path(file_path)
+            file_name = base(file_path).replace('.ncm', '')
+            
             # 使用上下文管理器处理NCM文件
-            with NCMFile(file_path) as ncm_file:
-                ncm_file.parse()
+            with self.reserve_memory(file_path, mode, add_tags, buffer_size, chunk_size) as low_memory, \
+                    NCMFile(file_path) as ncm_file:
+                if mode == MODE_RETAG:
+                    return self.retag_file(ncm_file, file_path, output_dir)
+                
+                # 只导出元数据时不需要读取音乐数据
+                if mode == MODE_META:
+                    ncm_file.parse_header()
+                    converter = Converter(ncm_file)
+                    converter.handle_meta()
+                    
+                    os.makedirs(output_dir, exist_ok=True)
+                    output_path = join(output_dir, file_name)
+                    for path in write_sidecar(output_path, converter.meta_data, ncm_file.cover.detail):
+                        print(f"写入文件: {path}")
+                    print(f"导出完成: {output_path}")
+                    return output_path
+                
+                ncm_file.buffer_size = buffer_size
+                ncm_file.io_policy = self.io_policy
+                ncm_file.digest = self.make_digest()
+                with self.device_io(file_path):
+                    if low_memory:
+                        # 只解析文件头，音乐数据边读边解密边写出
+                        ncm_file.parse_header()
+                    else:
+                        ncm_file.parse()
                 
-                # 转换
+                # 转换，输出格式由解密后的开头数据决定
                 converter = Converter(ncm_file)
-                converter.handle_all()
+                converter.chunk_size = chunk_size
+                converter.handle_key()
+                converter.handle_meta()
+                converter.detect_format()
                 
-                # 处理输出路径
-                if not output_dir:
-                    output_dir = dir_path(file_path)
-                    
-                file_name = base(file_path).replace('.ncm', '')
                 output_path = join(output_dir, f"{file_name}.{converter.meta_data.format}")
                 
                 # 确保输出目录存在
@@ -40,23 +133,453 @@ class NCMConverter:
                 
                 # 写入文件
                 print(f"写入文件: {output_path}")
-                with open(output_path, 'wb') as f:
-                    f.write(converter.music_data)
+                add_tag = mode == MODE_FULL and add_tags and converter.meta_data
+                digest = self.make_digest()
+                scope = SCOPE_FILE
+                # 低内存模式下写入的同时还在读取源文件
+                io_paths = (output_path, file_path) if low_memory else (output_path,)
+                if add_tag and self.tags_in_memory(mode, add_tags) and not low_memory:
+                    # 先在内存中添加标签再写出：摘要与最终文件一致，nocache 策略下
+                    # 也不用在释放页缓存后再把文件读回来插入标签
+                    buffer = BytesIO()
+                    converter.write_music(buffer)
+                    self.tag_output(output_path, converter.meta_data, ncm_file.cover.detail, target=buffer)
+                    with self.device_io(*io_paths), PolicyWriter(output_path, self.io_policy) as f:
+                        (HashingWriter(f, digest) if digest else f).write(buffer.getbuffer())
+                else:
+                    with self.device_io(*io_paths), PolicyWriter(output_path, self.io_policy) as f:
+                        converter.write_music(HashingWriter(f, digest) if digest else f)
+                    
+                    # 添加标签，只解密时跳过 (也不导入 mutagen)
+                    if add_tag and self.tag_output(output_path, converter.meta_data, ncm_file.cover.detail):
+                        scope = SCOPE_AUDIO
                 
-                # 添加标签
-                if add_tags and converter.meta_data:
-                    try:
-                        print(f"添加标签: {output_path}")
-                        tagger = create_tagger(output_path, converter.meta_data.format)
-                        tag_audio_file(tagger, ncm_file.cover.detail, converter.meta_data)
-                    except Exception as tag_error:
-                        print(f"添加标签失败: {str(tag_error)}")
-                        print("继续保留已转换的音频文件...")
+                if not self.check_output(output_path, file_path):
+                    return None
+                self.record_checksum(file_path, ncm_file.digest, output_path, digest, scope)
                 
             print(f"转换完成: {output_path}")
+            return output_path
                 
         except Exception as e:
             print(f"转换文件失败 {file_path}: {str(e)}")
+            return None
+
+    def tags_in_memory(self, mode: str, add_tags: bool) -> bool:
+        """
+        完整转换时是否先在内存中添加标签再写出：需要校验和 (摘要与最终文件一致)
+        或者 nocache 策略 (不用把释放了页缓存的文件读回来) 时
+        """
+        return mode == MODE_FULL and add_tags and bool(self.checksum or self.io_policy.enabled)
+
+    @contextmanager
+    def reserve_memory(self, file_path: str, mode: str, add_tags: bool = True,
+                       buffer_size: int = 0, chunk_size: int = 0):
+        """
+        按内存上限登记所选处理路径实际持有的内存，返回是否使用低内存模式：
+        整个读入时持有加密数据，在内存中添加标签时还要加上完整的输出缓冲区；
+        空间不足时不整个读入，改为按块流式处理，只占用读取和解密块大小的内存
+        """
+        if mode not in (MODE_FULL, MODE_DECRYPT):
+            yield False
+            return
+
+        size = file_size(file_path)
+        nbytes = size * 2 if self.tags_in_memory(mode, add_tags) else size
+        low_memory = False
+        if self.memory_budget:
+            if not self.memory_budget.try_acquire(nbytes):
+                low_memory = True
+                nbytes = min(size, (buffer_size or self.buffer_size) + 2 * (chunk_size or self.chunk_size))
+                print(f"超出内存上限，使用低内存模式: {file_path}")
+                self.memory_budget.acquire(nbytes)
+        try:
+            with self.track_memory('转换', file_path, nbytes):
+                yield low_memory
+        finally:
+            if self.memory_budget:
+                self.memory_budget.release(nbytes)
+
+    def track_memory(self, stage: str, file_path: str, nbytes: int):
+        """开启内存统计时记录缓冲区占用，否则什么也不做"""
+        if self.memory_tracker:
+            return self.memory_tracker.track(stage, file_path, nbytes)
+        return nullcontext()
+
+    def device_io(self, *paths: str):
+        """占用路径所在设备的 I/O 名额，未开启设备限制时什么也不做"""
+        if self.device_limiter:
+            return self.device_limiter.access(*paths)
+        return nullcontext()
+
+    def track_key(self, file_path: str) -> Optional[str]:
+        """计算去重键，读取源文件时同样占用设备的 I/O 名额"""
+        with self.device_io(file_path):
+            return safe_track_key(file_path)
+
+    def report_memory(self) -> None:
+        """停止采样并输出内存报告"""
+        if self.memory_tracker:
+            self.memory_tracker.stop()
+            for line in self.memory_tracker.summary():
+                print(line)
+
+    def convert_batch(self, files: List[str], output_dir: str, add_tags: bool = True,
+                      mode: str = MODE_FULL, block_size: int = 0) -> List[Optional[str]]:
+        """
+        在一个线程池任务中依次转换一批小文件。同一个线程内的 AES 对象
+        和已导入的标签模块会被后续文件复用，每个文件不再单独提交任务
+        """
+        return [self.convert_file(file_path, output_dir, add_tags, mode, block_size) for file_path in files]
+
+    def make_digest(self) -> Any:
+        """按配置的算法创建摘要对象，未开启校验和时返回 None"""
+        return new_digest(self.checksum) if self.checksum else None
+
+    def record_checksum(self, source: str, source_digest: Any, output: str,
+                        output_digest: Any, scope: str = SCOPE_FILE, output_size: int = -1) -> None:
+        """把源文件和输出文件的摘要写入清单"""
+        if self.manifest:
+            if output_size < 0:
+                output_size = file_size(output)
+            if self.output_checksums is not None:
+                self.output_checksums[output] = (output_digest, scope, output_size)
+            self.manifest.record(source, file_size(source), source_digest,
+                                 output, output_size, output_digest, scope)
+
+    def close_manifest(self) -> None:
+        if self.manifest:
+            self.manifest.close()
+            print(f"校验和清单: {self.manifest.path} ({self.manifest.count} 条)")
+
+    def tag_output(self, output_path: str, meta: Meta, cover: Optional[bytes],
+                   retag: bool = False, target: Optional[BinaryIO] = None) -> bool:
+        """
+        给输出文件添加标签，失败时保留已转换的音频文件。
+        retag 时先清除旧标签，并尽量在预留的填充空间内原地更新。
+        target 是内存中的输出数据时在其中添加标签，output_path 只用于日志和专辑封面目录
+        """
+        try:
+            from tag.tag import create_tagger, tag_audio_file
+            from tag.base import keep_padding
+            print(f"{'更新' if retag else '添加'}标签: {output_path}")
+            cover = self.cover_cache.get(meta, cover)
+            embed = self.cover_cache.embed
+            if not embed:
+                folder_cover, embed = self.cover_cache.write_folder_cover(dir_path(output_path), meta, cover)
+                if folder_cover:
+                    print(f"写入专辑封面: {folder_cover}")
+                elif embed:
+                    print(f"目录中已有其它专辑的封面，改为内嵌: {output_path}")
+            tagger = create_tagger(target or output_path, meta.format)
+            if retag:
+                tagger.clear()
+                tagger.padding = keep_padding
+            # 封面 (包括下载) 已经由 CoverCache 按专辑处理过一次，这里不再下载
+            tag_audio_file(tagger, cover, meta, embed, fetch=False)
+            if target is None:
+                # 原地添加标签会重新读写输出文件，按 I/O 策略再释放一次
+                self.io_policy.drop_path(output_path)
+            return True
+        except Exception as tag_error:
+            print(f"添加标签失败: {str(tag_error)}")
+            print("继续保留已转换的音频文件...")
+            return False
+
+    def retag_file(self, ncm_file: NCMFile, file_path: str, output_dir: str) -> Optional[str]:
+        """只读取NCM文件头 (密钥/元数据/封面)，更新已有输出文件的标签，不解密音频"""
+        ncm_file.parse_header()
+        converter = Converter(ncm_file)
+        converter.handle_meta()
+
+        outputs = [p for p in self.output_candidates(file_path, output_dir) if os.path.exists(p)]
+        if not outputs:
+            print(f"未找到输出文件: {file_path}")
+            return None
+
+        output_path = outputs[0]
+        # 以输出文件的实际格式为准
+        converter.meta_data.format = ext(output_path).lstrip('.').lower()
+        if not self.tag_output(output_path, converter.meta_data, ncm_file.cover.detail, retag=True):
+            return None
+        print(f"标签更新完成: {output_path}")
+        return output_path
+
+    def check_output(self, output_path: str, file_path: str) -> bool:
+        """开启校验时检查输出文件，未开启时总是通过"""
+        if not self.verify:
+            return True
+        result = verify_output(output_path, file_path)
+        if not result.ok:
+            print(f"校验失败 {output_path}: {result.error}")
+        return result.ok
+
+    def stage_read(self, job: ConvertJob) -> ConvertJob:
+        """读取阶段：解析文件头并把音乐数据读入内存，随后立即关闭文件"""
+        print(f"开始转换: {job.file_path}")
+        if self.memory_budget:
+            # 加密数据和解密结果会同时存在于解密阶段，流水线中只能等待空间
+            self.memory_budget.acquire(job.reserved)
+        with self.device_io(job.file_path), NCMFile(job.file_path) as ncm_file:
+            ncm_file.buffer_size = self.buffer_size
+            ncm_file.io_policy = self.io_policy
+            ncm_file.digest = self.make_digest()
+            ncm_file.parse()
+        if ncm_file.music.length <= 0:
+            # 文件已经关闭，没有音乐数据时不能再交给解密阶段流式读取
+            print(f"转换文件失败 {job.file_path}: 没有音乐数据")
+            return None
+        job.ncm_file = ncm_file
+        return job
+
+    def stage_decrypt(self, job: ConvertJob) -> ConvertJob:
+        """解密阶段：纯 CPU 计算，完成后释放加密数据"""
+        converter = Converter(job.ncm_file)
+        converter.chunk_size = self.chunk_size
+        converter.handle_key()
+        converter.handle_meta()
+        converter.detect_format()
+        converter.handle_music()
+        job.ncm_file.music.detail = b''
+        job.converter = converter
+
+        file_name = base(job.file_path).replace('.ncm', '')
+        job.output_path = join(job.output_dir or dir_path(job.file_path), f"{file_name}.{converter.meta_data.format}")
+        return job
+
+    def stage_write(self, job: ConvertJob) -> ConvertJob:
+        """写入阶段：写出解密后的音频，完成后释放内存"""
+        os.makedirs(dir_path(job.output_path), exist_ok=True)
+        print(f"写入文件: {job.output_path}")
+        job.digest = self.make_digest()
+        with self.device_io(job.output_path), PolicyWriter(job.output_path, self.io_policy) as f:
+            job.converter.write_music(HashingWriter(f, job.digest) if job.digest else f)
+        job.converter.music_data = None
+        return job
+
+    def stage_tag(self, job: ConvertJob) -> ConvertJob:
+        """标签阶段：mutagen 写标签以及可能的封面下载"""
+        if job.converter.meta_data:
+            if self.tag_output(job.output_path, job.converter.meta_data, job.ncm_file.cover.detail):
+                # 标签在写入之后原地添加，摘要只覆盖音频数据
+                job.scope = SCOPE_AUDIO
+        return job
+
+    def finish_job(self, job: ConvertJob) -> Optional[ConvertJob]:
+        """流水线最后一步：校验输出并报告结果"""
+        if not self.check_output(job.output_path, job.file_path):
+            return None
+        self.record_checksum(job.file_path, job.ncm_file.digest, job.output_path, job.digest, job.scope)
+        print(f"转换完成: {job.output_path}")
+        return job
+
+    def run_pipeline(self, files: List[str], args: argparse.Namespace) -> None:
+        """
+        分阶段流水线：读取、解密、写入、标签各有独立的线程池和有界队列，
+        不同文件的 I/O 和 CPU 计算可以重叠进行
+        """
+        read_workers, decrypt_workers, write_workers, tag_workers = parse_stages(args.stages)
+        steps = [
+            ('读取', self.stage_read, read_workers),
+            ('解密', self.stage_decrypt, decrypt_workers),
+            ('写入', self.stage_write, write_workers),
+        ]
+        if args.mode == MODE_FULL and args.tag:
+            steps.append(('标签', self.stage_tag, tag_workers))
+
+        # 最后一个阶段顺带完成校验和结果报告
+        name, fn, workers = steps[-1]
+        steps[-1] = (name, lambda job, fn=fn: self.finish_job(fn(job)), workers)
+
+        def tracked(name, fn):
+            def run_stage(job):
+                with self.track_memory(name, job.file_path, job.reserved):
+                    return fn(job)
+            return run_stage
+
+        def release(job):
+            if self.memory_budget:
+                self.memory_budget.release(job.reserved)
+
+        def new_job(file_path):
+            # 解密阶段同时持有加密数据和解密结果
+            return ConvertJob(file_path, args.output, reserved=2 * file_size(file_path))
+
+        pipeline = Pipeline(
+            [Stage(name, tracked(name, fn), workers, args.queue_size) for name, fn, workers in steps],
+            on_done=release
+        )
+        jobs = (new_job(file_path) for file_path in files)
+        elapsed = pipeline.run(jobs)
+        for line in pipeline.summary(elapsed):
+            print(line)
+
+    def output_candidates(self, file_path: str, output_dir: str) -> List[str]:
+        """NCM文件可能对应的输出文件路径"""
+        name = base(file_path).replace('.ncm', '')
+        return [join(output_dir or dir_path(file_path), f"{name}.{fmt}") for fmt in ('flac', 'mp3')]
+
+    def verify_all(self, files: List[str], output_dir: str, max_workers: int) -> bool:
+        """并行校验一批NCM文件对应的输出，返回是否全部通过"""
+        pairs = []
+        missing = []
+        for file_path in files:
+            outputs = [p for p in self.output_candidates(file_path, output_dir) if os.path.exists(p)]
+            if outputs:
+                pairs.extend((p, file_path) for p in outputs)
+            else:
+                missing.append(file_path)
+
+        results = verify_files(pairs, max_workers)
+        failed = [r for r in results if not r.ok]
+        for r in failed:
+            print(f"校验失败 {r.path}: {r.error}")
+        for file_path in missing:
+            print(f"未找到输出文件: {file_path}")
+        print(f"校验完成: {len(results) - len(failed)} 个通过, {len(failed)} 个失败, {len(missing)} 个缺失")
+        return not failed and not missing
+
+    def convert_group(self, files: List[str], key: Optional[str], output_dir: str,
+                      add_tags: bool = True, mode: str = MODE_FULL,
+                      link_method: str = LINK_REFLINK, block_size: int = 0) -> Optional[str]:
+        """
+        转换一组相同的曲目：只转换一次，其余文件的输出通过 reflink/硬链接得到。
+        第一个文件转换失败时依次尝试组内的下一个；同一去重键之前已经转换过时整组直接链接。
+        """
+        output_path = self.dedup_index.get(key) if key else None
+        duplicates = files
+        if not output_path:
+            for index, file_path in enumerate(files):
+                output_path = self.convert_file(file_path, output_dir, add_tags, mode, block_size)
+                if output_path:
+                    break
+            if not output_path:
+                return None
+            if key:
+                self.dedup_index.add(key, output_path)
+            # 转换失败的文件同样链接到成功的输出
+            duplicates = files[:index] + files[index + 1:]
+
+        for duplicate in duplicates:
+            name = base(duplicate).replace('.ncm', '')
+            target = join(output_dir or dir_path(duplicate), f"{name}{ext(output_path)}")
+            if target == output_path:
+                continue
+            try:
+                method = link_output(output_path, target, link_method)
+                print(f"重复曲目 ({method}): {duplicate} -> {target}")
+                if self.manifest:
+                    # 重复文件的源文件没有完整读取，摘要为 null；输出与已转换的文件内容相同
+                    output_digest, scope, output_size = (self.output_checksums or {}).get(
+                        output_path, (None, SCOPE_FILE, -1))
+                    self.record_checksum(duplicate, None, target, output_digest, scope, output_size)
+            except Exception as e:
+                print(f"链接重复曲目失败 {duplicate}: {str(e)}")
+        return output_path
+
+    def _make_converter(self, ncm_file: NCMFile, chunk_size: int = 0) -> Converter:
+        """处理密钥和元数据并根据解密后的开头数据确定输出格式"""
+        converter = Converter(ncm_file)
+        converter.chunk_size = chunk_size or self.chunk_size
+        converter.handle_key()
+        converter.handle_meta()
+        converter.detect_format()
+        return converter
+
+    def _prepare_stream(self, ncm_file: NCMFile, chunk_size: int = 0) -> Converter:
+        """只解析文件头并确定输出格式，音乐数据留给后续流式解密"""
+        ncm_file.io_policy = self.io_policy
+        ncm_file.parse_header()
+        return self._make_converter(ncm_file, chunk_size)
+
+    def convert_to_buffer(self, source: NCMSource, add_tags: bool = True, name: Optional[str] = None,
+                          digest: Any = None, folder: Optional[str] = None,
+                          block_size: int = 0) -> Tuple[Meta, BytesIO, Optional[bytes]]:
+        """
+        在内存中完成解密和标签，返回 (元数据, 输出缓冲区, 需要写入专辑目录的封面)。
+        digest 不为空时读取源数据的同时计算其摘要；folder 是 folder 封面策略下输出所在的目录
+        """
+        with NCMFile(source, name=name) as ncm_file:
+            ncm_file.digest = digest
+            converter = self._prepare_stream(ncm_file, block_size)
+            return self._write_buffer(ncm_file, converter, add_tags, folder)
+
+    def _write_buffer(self, ncm_file: NCMFile, converter: Converter, add_tags: bool,
+                      folder: Optional[str]) -> Tuple[Meta, BytesIO, Optional[bytes]]:
+        """把解密后的音乐数据写入内存缓冲区并添加标签，返回值同 convert_to_buffer"""
+        buffer = BytesIO()
+        converter.write_music(buffer)
+        if not (add_tags and converter.meta_data):
+            return converter.meta_data, buffer, None
+
+        folder_cover = None
+        try:
+            from tag.tag import create_tagger, tag_audio_file
+            cover = self.cover_cache.get(converter.meta_data, ncm_file.cover.detail)
+            embed = self.cover_cache.embed
+            if not embed and cover and folder is not None:
+                claimed, embed = self.cover_cache.claim_folder(folder, converter.meta_data, cover)
+                folder_cover = cover if claimed else None
+            tagger = create_tagger(buffer, converter.meta_data.format)
+            tag_audio_file(tagger, cover, converter.meta_data, embed, fetch=False)
+        except Exception as tag_error:
+            print(f"添加标签失败: {str(tag_error)}")
+        return converter.meta_data, buffer, folder_cover
+
+    def convert_stream(self, source: NCMSource, sink: BinaryIO, add_tags: bool = True,
+                       name: Optional[str] = None) -> Meta:
+        """
+        在内存中完成转换：source 可以是 bytes、memoryview 或文件对象 (可以不支持 seek)，
+        结果写入任意可写的 sink。需要添加标签时先在内存缓冲区中完成再一次性写出。
+        """
+        if add_tags:
+            meta, buffer, _ = self.convert_to_buffer(source, add_tags, name)
+            sink.write(buffer.getbuffer())
+            return meta
+
+        with NCMFile(source, name=name) as ncm_file:
+            converter = self._prepare_stream(ncm_file)
+            converter.write_music(sink)
+            return converter.meta_data
+
+    def convert_to_archive(self, file_path: str, arcname: str, archive: ArchiveWriter,
+                           add_tags: bool = True, mode: str = MODE_FULL, block_size: int = 0) -> Optional[str]:
+        """转换单个文件并直接写入归档，arcname 是不含扩展名的归档内路径"""
+        try:
+            print(f"开始转换: {file_path}")
+            source_digest = self.make_digest()
+            add_tags = add_tags and mode == MODE_FULL
+            folder = posixpath.dirname(arcname)
+            if self.device_limiter:
+                # 只有读取源文件占用设备名额，解密、标签和封面下载在名额之外进行
+                with self.device_io(file_path), NCMFile(file_path) as ncm_file:
+                    ncm_file.buffer_size = block_size or self.buffer_size
+                    ncm_file.io_policy = self.io_policy
+                    ncm_file.digest = source_digest
+                    ncm_file.parse()
+                converter = self._make_converter(ncm_file, block_size)
+                meta, buffer, folder_cover = self._write_buffer(ncm_file, converter, add_tags, folder)
+            else:
+                meta, buffer, folder_cover = self.convert_to_buffer(file_path, add_tags, digest=source_digest,
+                                                                    folder=folder, block_size=block_size)
+            member = f"{arcname}.{meta.format}"
+            archive.add(member, buffer.getbuffer())
+            if self.manifest:
+                # 归档成员在内存中已经是最终内容，直接计算摘要
+                output_digest = self.make_digest()
+                output_digest.update(buffer.getbuffer())
+                self.record_checksum(file_path, source_digest, member, output_digest,
+                                     output_size=len(buffer.getbuffer()))
+
+            # folder 策略：每个归档目录只写入一次封面
+            if folder_cover:
+                archive.add(posixpath.join(posixpath.dirname(member), cover_file_name(folder_cover)), folder_cover)
+
+            print(f"写入归档: {member}")
+            return member
+        except Exception as e:
+            print(f"转换文件失败 {file_path}: {str(e)}")
+            return None
 
     def find_ncm_files(self, directory: str, depth: int) -> List[str]:
         """递归查找NCM文件"""
@@ -84,20 +607,150 @@ class NCMConverter:
             return self.find_ncm_files(path, depth)
         return []
 
+    def plan(self, files: List[str], args: argparse.Namespace) -> None:
+        """只读取文件头估算本次转换的开销，不解密音乐数据"""
+        from batch.plan import Plan, measure_throughput
+
+        plan = Plan.from_files(files, args.thread)
+        throughput = measure_throughput() if args.mode in (MODE_FULL, MODE_DECRYPT) else None
+        # 解密并行度受 CPU 核数限制
+        threads = min(args.thread, os.cpu_count() or 1)
+        tagged = args.mode == MODE_FULL and args.tag
+        for line in plan.summary(threads, throughput, tagged, args.cover, args.cover_size):
+            print(line)
+
+    def warm_up(self, mode: str = MODE_FULL) -> None:
+        """预热：提前完成 Numba 编译并导入标签相关的模块"""
+        if mode in (MODE_FULL, MODE_DECRYPT):
+            from converter.cipher import warmup
+            warmup()
+        if mode == MODE_FULL:
+            # 预先导入 mutagen
+            importlib.import_module('tag.tag')
+
+    def watch(self, args: argparse.Namespace) -> None:
+        """守护模式：监听输入目录，新的NCM文件下载完成后立即转换"""
+        from batch.watch import Watcher
+
+        self.warm_up(args.mode)
+        watcher = Watcher(args.input, args.depth, settle=args.settle, use_inotify=not args.poll)
+        print(f"监听模式 ({watcher.backend})，文件 {args.settle} 秒内不再变化后开始转换")
+
+        with ThreadPoolExecutor(max_workers=args.thread) as self.thread_pool:
+            for file_path in watcher.ready_files():
+                self.thread_pool.submit(
+                    self.convert_file,
+                    file_path,
+                    args.output,
+                    args.tag,
+                    args.mode
+                )
+
+    def run_tuned(self, tasks: List[Tuple[Callable, tuple, int]], tuner: Autotuner) -> None:
+        """
+        按自动调优给出的并发数逐个提交任务，并把完成的数据量 (任务的源文件总大小) 反馈给调优器。
+        块大小作为任务参数传入，任务开始执行时调优器已经进入下一组测量也不受影响
+        """
+        cond = threading.Condition()
+        in_flight = 0
+        futures = []
+
+        def on_done(trial, size):
+            def callback(_):
+                nonlocal in_flight
+                tuner.record(trial, size)
+                with cond:
+                    in_flight -= 1
+                    cond.notify_all()
+            return callback
+
+        for fn, task_args, size in tasks:
+            with cond:
+                while True:
+                    trial, workers, block_size = tuner.current()
+                    if in_flight < workers:
+                        break
+                    cond.wait()
+                in_flight += 1
+            future = self.thread_pool.submit(fn, *task_args, block_size=block_size)
+            future.add_done_callback(on_done(trial, size))
+            futures.append(future)
+
+        for _ in futures:
+            _.result()
+
     def run(self, args: argparse.Namespace) -> None:
         """主运行函数"""
         print(f"NCM转换器 v{self.version}")
         print(f"线程数: {args.thread}")
+        print(f"模式: {args.mode}")
+        
+        if args.watch:
+            unsupported = [flag for flag, enabled in (('--pipeline', args.pipeline), ('--archive', args.archive),
+                                                      ('--dedup', args.dedup)) if enabled]
+            if unsupported:
+                print(f"错误: 监听模式不支持 {', '.join(unsupported)}")
+                return
         
         # 处理输出目录
         if args.output:
             os.makedirs(args.output, exist_ok=True)
         
-        # 收集所有需要处理的文件
+        self.verify = args.verify
+        self.cover_cache = CoverCache(args.cover, args.cover_size)
+        self.io_policy = IOPolicy(args.io_policy, parse_size(args.io_size) if args.io_size else 0)
+        if self.io_policy.io_size:
+            # 读取缓冲区和解密块都使用对齐后的大块 I/O
+            self.buffer_size = self.chunk_size = self.io_policy.io_size
+        if args.mem_limit:
+            self.memory_budget = MemoryBudget(parse_size(args.mem_limit))
+            print(f"内存上限: {format_size(self.memory_budget.limit)}")
+        if args.mem_limit or args.mem_report:
+            self.memory_tracker = MemoryTracker()
+        if args.checksum:
+            self.checksum = args.checksum
+            manifest_path = args.manifest or join(args.output or '.', 'checksums.jsonl')
+            self.manifest = Manifest(manifest_path, args.checksum)
+            if args.dedup:
+                self.output_checksums = {}
+        
+        if args.watch:
+            self.watch(args)
+            return
+        
+        # 收集所有需要处理的文件，同时记录分片使用的相对路径
         all_files = []
+        keys = {}
+        members = {}  # 归档成员路径：相对于所在输入目录，与 --shard-root 无关
+        if args.files_from:
+            # 直接使用给定的文件列表，跳过目录扫描
+            if args.files_from == '-':
+                entries = read_file_list(sys.stdin, args.null)
+            else:
+                with open(args.files_from, encoding='utf-8') as f:
+                    entries = read_file_list(f, args.null)
+            for entry in entries:
+                file_path = clean(entry)
+                if file_path not in keys:
+                    all_files.append(file_path)
+                    keys[file_path] = shard_key(entry, args.shard_root)
+                    # 列表中的相对路径相对于当前目录
+                    members[file_path] = keys[file_path] if args.shard_root else shard_key(entry, os.getcwd())
+                    
         for input_path in args.input:
             files = self.process_path(input_path, args.depth)
-            all_files.extend(files)
+            root = clean(input_path) if os.path.isdir(input_path) else dir_path(clean(input_path))
+            for file_path in files:
+                if file_path not in keys:
+                    all_files.append(file_path)
+                    keys[file_path] = shard_key(file_path, args.shard_root or root)
+                    members[file_path] = shard_key(file_path, root)
+        
+        # 多机分片：按相对路径的哈希分配，各机器处理互不重叠的子集
+        if args.shard:
+            index, count = parse_shard(args.shard)
+            all_files = [f for f in all_files if shard_of(keys[f], count) == index]
+            print(f"分片 {index}/{count}")
             
         if not all_files:
             print("未找到NCM文件")
@@ -105,38 +758,214 @@ class NCMConverter:
             
         print(f"找到 {len(all_files)} 个NCM文件")
         
+        if args.device_aware or args.device_limit:
+            self.device_limiter = DeviceLimiter(args.device_limit)
+            # 输出到归档时只读取源文件
+            paths = {dir_path(f) for f in all_files}
+            if not args.archive and args.mode in (MODE_FULL, MODE_DECRYPT):
+                if args.output:
+                    paths.add(args.output)
+            for line in self.device_limiter.describe(list(paths)):
+                print(line)
+            all_files = interleave_by_device(all_files)
+        
+        if args.plan:
+            self.plan(all_files, args)
+            return
+        
+        if args.mode == MODE_VERIFY:
+            self.verify_all(all_files, args.output, args.thread)
+            return
+        
+        if args.pipeline and args.mode in (MODE_FULL, MODE_DECRYPT) and not args.archive:
+            if args.dedup or args.autotune:
+                print("分阶段流水线模式下忽略 --dedup/--autotune")
+            self.warm_up(args.mode)
+            self.run_pipeline(all_files, args)
+            self.report_memory()
+            self.close_manifest()
+            print("所有文件处理完成")
+            return
+        
+        # 自动调优，或者使用本机之前保存的调优结果
+        tuner = None
+        if args.autotune:
+            # 先完成 JIT 编译，避免第一组测量被编译时间拖慢
+            self.warm_up(args.mode)
+            tuner = Autotuner(max(args.thread, 2 * (os.cpu_count() or 1)))
+        elif args.use_profile:
+            profile = load_profile()
+            if profile:
+                args.thread = profile['workers']
+                self.buffer_size = self.chunk_size = profile['block_size']
+                print(f"使用本机调优参数: 线程 {args.thread}, 块大小 {self.chunk_size // 1024}KB")
+        
+        archive = None
+        if args.archive:
+            if args.mode not in (MODE_FULL, MODE_DECRYPT):
+                print("归档输出只支持 full/decrypt 模式")
+                return
+            if args.dedup:
+                print("归档输出模式下忽略 --dedup")
+            archive = ArchiveWriter(args.archive, args.archive_format, self.io_policy)
+        
         # 使用线程池处理文件
-        with ThreadPoolExecutor(max_workers=args.thread) as self.thread_pool:
-            futures = [
-                self.thread_pool.submit(
-                    self.convert_file,
-                    file_path,
-                    args.output,
-                    args.tag
-                )
-                for file_path in all_files
-            ]
+        with ThreadPoolExecutor(max_workers=tuner.max_workers if tuner else args.thread) as self.thread_pool:
+            if archive:
+                # 按相对路径写入归档，不在磁盘上创建任何输出文件或目录
+                tasks = [
+                    (self.convert_to_archive,
+                     (file_path, archive_name(members[file_path]), archive, args.tag, args.mode), file_size(file_path))
+                    for file_path in all_files
+                ]
+            elif args.dedup and args.mode in (MODE_FULL, MODE_DECRYPT):
+                # 只读取文件头和少量采样计算去重键，相同曲目只转换一次
+                track_keys = list(self.thread_pool.map(self.track_key, all_files))
+                groups = self.dedup_index.group(all_files, track_keys)
+                key_of = dict(zip(all_files, track_keys))
+                print(f"去重后剩余 {len(groups)} 个曲目，{len(all_files) - len(groups)} 个重复文件将被链接")
+                tasks = [
+                    (self.convert_group, (group, key_of[group[0]], args.output, args.tag, args.mode, args.link),
+                     file_size(group[0]))
+                    for group in groups
+                ]
+            else:
+                # 小文件按总字节数合并成批，分摊每个任务的固定开销。
+                # 自动调优需要足够多的任务来测量每组参数，此时不合并
+                sizes = {file_path: file_size(file_path) for file_path in all_files}
+                batch_bytes = 0 if tuner else parse_size(args.batch_size)
+                batches = make_batches(all_files, sizes, batch_bytes, args.thread)
+                if len(batches) < len(all_files):
+                    print(f"小文件合并为 {len(batches)} 个批次")
+                tasks = [
+                    (self.convert_batch, (batch, args.output, args.tag, args.mode), sum(sizes[f] for f in batch))
+                    for batch in batches
+                ]
             
-            # 等待所有任务完成
-            for _ in futures:
-                _.result()
+            if tuner:
+                self.run_tuned(tasks, tuner)
+            else:
+                futures = [self.thread_pool.submit(fn, *task_args) for fn, task_args, _ in tasks]
+                
+                # 等待所有任务完成
+                for _ in futures:
+                    _.result()
+        
+        if archive:
+            archive.close()
+            print(f"归档完成: {archive.count} 个文件, {archive.bytes / 1024 / 1024:.2f} MB")
+        
+        if tuner:
+            # 文件太少、调优没有完成时不保存，避免把未完成的测量结果用于之后的运行
+            if tuner.done:
+                save_profile(tuner.profile())
+                print(f"调优结果已保存: {PROFILE_PATH}")
+            else:
+                print("文件数量不足，自动调优未完成，不保存调优结果")
         
+        self.report_memory()
+        self.close_manifest()
         print("所有文件处理完成")
 
+def archive_name(key: str) -> str:
+    """
+    归档内的成员路径 (不含扩展名)：规范化相对路径并去掉 .ncm 后缀。
+    开头的 / 以及 . 和 .. 都会被去掉，解压时不会写到目标目录之外
+    """
+    parts = posixpath.normpath(key.replace('\\', '/')).split('/')
+    name = '/'.join(p for p in parts if p not in ('', '.', '..'))
+    return name[:-4] if name.lower().endswith('.ncm') else name
+
+def parse_stages(spec: str) -> Tuple[int, int, int, int]:
+    """解析 "读取,解密,写入,标签" 四个阶段的线程数"""
+    counts = [int(x) for x in spec.split(',')]
+    if len(counts) != 4 or min(counts) <= 0:
+        raise ValueError(f"阶段线程数格式应为 读取,解密,写入,标签: {spec}")
+    return tuple(counts)
+
 def main():
     parser = argparse.ArgumentParser(description='NCM音乐格式转换器')
-    parser.add_argument('input', nargs='+', help='输入文件或目录路径')
+    parser.add_argument('input', nargs='*', help='输入文件或目录路径')
+    parser.add_argument('-f', '--files-from', help='从文件读取输入列表，- 表示标准输入 (跳过目录扫描)')
+    parser.add_argument('-0', '--null', action='store_true', help='输入列表以 NUL 分隔 (配合 find -print0)')
+    parser.add_argument('--shard', help='只处理第 i 个分片 (i/N，i 从 0 开始)，按相对路径哈希分配')
+    parser.add_argument('--shard-root', default='', help='计算分片相对路径的根目录 (默认: 各输入目录)')
     parser.add_argument('-o', '--output', default='', help='输出目录')
     parser.add_argument('-t', '--tag', action='store_true', default=True, help='是否添加音乐标签')
+    parser.add_argument('-T', '--no-tag', dest='tag', action='store_false', help='不添加音乐标签')
+    parser.add_argument('-m', '--mode', choices=MODES, default=MODE_FULL,
+                        help='处理模式: full 完整转换, decrypt 只解密音频, meta 只导出元数据和封面, '
+                             'verify 只校验已有输出, retag 只读取文件头并原地更新已有输出的标签 (默认: full)')
+    parser.add_argument('--verify', action='store_true', help='转换后校验输出文件结构和音频长度')
+    parser.add_argument('--plan', action='store_true',
+                        help='只读取文件头估算开销：数据量、格式分布、输出空间、需要下载的封面和预计耗时，不进行转换')
+    parser.add_argument('--cover', choices=COVER_POLICIES, default=COVER_EMBED,
+                        help='封面策略: embed 原样内嵌, resize 每张专辑缩放一次后内嵌, thumb 内嵌缩略图, '
+                             'folder 每个专辑目录写 cover.jpg 不内嵌 (默认: embed)')
+    parser.add_argument('--cover-size', type=int, default=0, help='resize/thumb 的最大边长 (默认: 1200/300)')
+    parser.add_argument('--dedup', action='store_true', help='相同曲目 (musicId + 音频指纹) 只转换一次，其余链接到已转换的文件')
+    parser.add_argument('--link', choices=LINK_METHODS, default=LINK_REFLINK,
+                        help='去重时的链接方式，失败时依次退回硬链接和复制 (默认: reflink)')
+    parser.add_argument('-w', '--watch', action='store_true', help='守护模式：持续监听输入目录并转换新文件')
+    parser.add_argument('--settle', type=float, default=2.0, help='监听模式下文件多少秒不再变化才开始转换 (默认: 2)')
+    parser.add_argument('--poll', action='store_true', help='监听模式下不使用 inotify，改为定时轮询')
     parser.add_argument('-d', '--depth', type=int, default=5, help='查找文件的最大深度 (默认: 5)')
     parser.add_argument('-n', '--thread', type=int, default=4, help='最大线程数 (默认: 4)')
+    parser.add_argument('-p', '--pipeline', action='store_true',
+                        help='分阶段流水线：读取、解密、写入、标签各用独立线程池，I/O 与计算重叠')
+    parser.add_argument('--stages', default='2,4,2,2', help='流水线各阶段线程数: 读取,解密,写入,标签 (默认: 2,4,2,2)')
+    parser.add_argument('--queue-size', type=int, default=4, help='流水线每个阶段前的队列长度 (默认: 4)')
+    parser.add_argument('-a', '--archive', default='',
+                        help='把所有转换结果按相对路径顺序写入一个归档文件，- 表示标准输出 (日志改为输出到 stderr)')
+    parser.add_argument('--archive-format', choices=ARCHIVE_FORMATS, default=ARCHIVE_TAR,
+                        help='归档格式: tar 流式写入, zip 仅存储不压缩 (默认: tar)')
+    parser.add_argument('--io-policy', choices=IO_POLICIES, default=IO_DEFAULT,
+                        help='页缓存策略: default 不干预, nocache 顺序预读并在处理后释放源文件和输出文件的页缓存 (默认: default)')
+    parser.add_argument('--io-size', default='', help='读取/解密/写入使用的对齐块大小，如 1M、4M (默认: 各处的默认值)')
+    parser.add_argument('--checksum', choices=CHECKSUM_ALGORITHMS, default='',
+                        help='写入时顺带计算源文件和输出文件的摘要并写入清单，如 blake2b、sha256、xxh3_64')
+    parser.add_argument('--manifest', default='', help='校验和清单路径 (默认: 输出目录下的 checksums.jsonl)')
+    parser.add_argument('--batch-size', default='16M',
+                        help='小于该大小的文件按总字节数合并成批，每批在一个线程中依次转换，0 表示不合并 (默认: 16M)')
+    parser.add_argument('--device-aware', action='store_true',
+                        help='按源/目标所在设备 (st_dev) 分别限制 I/O 并发：机械硬盘 1、USB 和网络文件系统 2、SSD 不限制')
+    parser.add_argument('--device-limit', action='append', default=[],
+                        help='设置某类设备或某个路径所在设备的 I/O 并发数，如 hdd=2、/mnt/nas=1，可重复 (隐含 --device-aware)')
+    parser.add_argument('--mem-limit', default='',
+                        help='全局内存上限，如 512M、2G。整个读入内存会超出上限的文件改为按块流式处理 (流水线模式下等待)')
+    parser.add_argument('--mem-report', action='store_true', help='输出内存峰值报告 (整体、各阶段和占用最多的文件)')
+    parser.add_argument('--autotune', action='store_true',
+                        help='在前几个文件上测量吞吐量，自动调整线程数和读取/解密块大小，并按主机保存结果')
+    parser.add_argument('--use-profile', action='store_true', help='使用本机之前自动调优保存的参数')
     parser.add_argument('-v', '--version', action='version', version=f'%(prog)s {NCMConverter().version}')
     
     args = parser.parse_args()
+    if not args.input and not args.files_from:
+        parser.error('需要输入路径或 --files-from')
+    try:
+        if args.shard:
+            parse_shard(args.shard)
+        parse_stages(args.stages)
+        if args.io_size:
+            parse_size(args.io_size)
+        if args.mem_limit:
+            parse_size(args.mem_limit)
+        parse_size(args.batch_size)
+        for spec in args.device_limit:
+            parse_device_limit(spec)
+        if args.checksum:
+            new_digest(args.checksum)
+    except ValueError as e:
+        parser.error(str(e))
     
     try:
         converter = NCMConverter()
-        converter.run(args)
+        if args.archive == '-':
+            # 标准输出用于归档数据，日志改写到 stderr
+            with redirect_stdout(sys.stderr):
+                converter.run(args)
+        else:
+            converter.run(args)
     except KeyboardInterrupt:
         print("\n转换已取消")
     except Exception as e:
@@ -62,22 +62,21 @@ def process_single_file(file_path: Path, root_dir: Path, ncm_converter: Optional
             try:
                 print(f"\n转换文件: {file_path}")
                 
-                # 转换文件
-                ncm_converter.convert_file(
+                # 转换文件，输出扩展名由实际音频格式决定
+                output_path = ncm_converter.convert_file(
                     file_path=str(file_path),
                     output_dir=str(target_path.parent),
                     add_tags=True
                 )
                 
                 # 检查转换后的文件
-                expected_flac = file_path.with_suffix('.flac')
-                if expected_flac.exists():
-                    print(f"转换成功: {expected_flac}")
+                if output_path and Path(output_path).exists():
+                    print(f"转换成功: {output_path}")
                     # 删除原NCM文件
                     file_path.unlink()
                     print(f"已删除原文件: {file_path}")
                 else:
-                    print(f"警告: 未找到转换后的文件: {expected_flac}")
+                    print(f"警告: 转换或校验失败，保留原文件: {file_path}")
                     
             except Exception as e:
                 print(f"转换失败 {file_path}: {e}")
@@ -109,9 +108,11 @@ def collect_ncm_files(root_dir: Path) -> List[Path]:
         print(f"Collect Files Failed: {e}")
         return []
 
-def merge_album_folders(root_dir: str, convert_ncm: bool = True, max_workers: int = 4) -> None:
+def merge_album_folders(root_dir: str, convert_ncm: bool = True, max_workers: int = 4,
+                        verify: bool = True) -> None:
     """
-    合并同一专辑下的所有歌曲到主艺术家文件夹，并可选择性地转换NCM文件
+    合并同一专辑下的所有歌曲到主艺术家文件夹，并可选择性地转换NCM文件。
+    verify 为 True 时只有输出文件通过结构校验才删除原NCM文件
     """
     root_path = Path(root_dir)
     if not root_path.exists():
@@ -119,7 +120,7 @@ def merge_album_folders(root_dir: str, convert_ncm: bool = True, max_workers: in
         return
         
     # 创建NCM转换器实例
-    ncm_converter = NCMConverter() if convert_ncm else None
+    ncm_converter = NCMConverter(verify=verify) if convert_ncm else None
     
     # 收集所有NCM文件
     print("扫描文件中...")
@@ -0,0 +1,139 @@
+import os
+import io
+from typing import BinaryIO, Optional
+
+# 页缓存策略
+IO_DEFAULT = 'default'  # 不做任何提示，由内核决定
+IO_NOCACHE = 'nocache'  # 顺序预读提示，处理过的范围立即从页缓存中释放
+IO_POLICIES = (IO_DEFAULT, IO_NOCACHE)
+
+# 每累计这么多数据才释放一次页缓存，减少系统调用
+DROP_WINDOW = 8 * 1024 * 1024
+# 对齐的 I/O 大小以页为单位
+PAGE_SIZE = 4096
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+def parse_size(text: str) -> int:
+    """解析 "512K"、"4M"、"2G" 这样的大小，不带单位时为字节"""
+    text = text.strip().upper().rstrip('B') or '0'
+    unit = text[-1] if text[-1] in _UNITS else ''
+    number = text[:-1] if unit else text
+    try:
+        return int(float(number) * _UNITS[unit])
+    except ValueError:
+        raise ValueError(f"无效的大小: {text}")
+
+def align(size: int, alignment: int = PAGE_SIZE) -> int:
+    """向上对齐到 alignment 的整数倍"""
+    return max(alignment, (size + alignment - 1) // alignment * alignment)
+
+def _fileno(fd: BinaryIO) -> Optional[int]:
+    """获取文件描述符，内存数据或不支持 fadvise 的平台返回 None"""
+    if not hasattr(os, 'posix_fadvise'):
+        return None
+    try:
+        return fd.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+class IOPolicy:
+    """批量处理的页缓存策略，避免一次性读写的数据挤占其它服务的缓存"""
+
+    def __init__(self, mode: str = IO_DEFAULT, io_size: int = 0):
+        self.mode = mode
+        # 0 表示使用各处的默认大小
+        self.io_size = align(io_size) if io_size else 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == IO_NOCACHE
+
+    def advise(self, fd: BinaryIO, advice: int, offset: int = 0, length: int = 0) -> None:
+        fileno = _fileno(fd) if self.enabled else None
+        if fileno is None:
+            return
+        try:
+            os.posix_fadvise(fileno, offset, length, advice)
+        except OSError:
+            pass
+
+    def sequential(self, fd: BinaryIO) -> None:
+        """提示内核整个文件会被顺序读取，加大预读"""
+        if self.enabled:
+            self.advise(fd, os.POSIX_FADV_SEQUENTIAL)
+
+    def drop(self, fd: BinaryIO, offset: int = 0, length: int = 0) -> None:
+        """释放指定范围的页缓存，length 为 0 表示到文件末尾"""
+        if self.enabled:
+            self.advise(fd, os.POSIX_FADV_DONTNEED, offset, length)
+
+    def drop_path(self, path: str) -> None:
+        """
+        释放整个文件的页缓存，用于原地修改过的文件 (例如添加标签之后)。
+        脏页要先回写才能被释放
+        """
+        if not self.enabled:
+            return
+        try:
+            with open(path, 'rb') as fd:
+                getattr(os, 'fdatasync', os.fsync)(fd.fileno())
+                self.drop(fd)
+        except OSError:
+            pass
+
+    def tracker(self, fd: BinaryIO, writing: bool = False) -> 'DropBehind':
+        return DropBehind(self, fd, writing)
+
+class DropBehind:
+    """
+    记录顺序读写的位置，每处理 DROP_WINDOW 字节释放一次之前的页缓存。
+    写入时脏页要先回写才能释放，所以会把上一个窗口再提示一次。
+    """
+
+    def __init__(self, policy: IOPolicy, fd: BinaryIO, writing: bool = False):
+        self.policy = policy
+        self.fd = fd
+        self.writing = writing
+        self.dropped = 0
+
+    def update(self, position: int) -> None:
+        if not self.policy.enabled or position - self.dropped < DROP_WINDOW:
+            return
+        start = max(0, self.dropped - DROP_WINDOW) if self.writing else self.dropped
+        self.policy.drop(self.fd, start, position - start)
+        self.dropped = position
+
+    def finish(self) -> None:
+        """处理结束后释放整个文件的页缓存"""
+        if self.writing and self.policy.enabled:
+            try:
+                self.fd.flush()
+            except (AttributeError, OSError):
+                pass
+        self.policy.drop(self.fd)
+
+class PolicyWriter:
+    """按 I/O 策略写入文件的包装：统计写入位置并在关闭时释放页缓存"""
+
+    def __init__(self, path: str, policy: IOPolicy):
+        buffering = policy.io_size or -1
+        self.fd = open(path, 'wb', buffering=buffering)
+        self.tracker = policy.tracker(self.fd, writing=True)
+        self.position = 0
+
+    def write(self, data) -> int:
+        written = self.fd.write(data)
+        self.position += written
+        self.tracker.update(self.position)
+        return written
+
+    def close(self) -> None:
+        self.tracker.finish()
+        self.fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
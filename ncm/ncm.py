@@ -1,7 +1,12 @@
 import os
 import struct
-from typing import Tuple, Optional
-from .errors import NCMExtError, NCMMagicHeaderError
+from io import BytesIO
+from typing import Tuple, Optional, Union, BinaryIO, Iterator
+from .errors import NCMError, NCMExtError, NCMMagicHeaderError
+from .io import IOPolicy
+
+# 可以作为 NCMFile 输入的数据源：路径、内存数据或文件对象
+NCMSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
 
 class Data:
     """数据结构类"""
@@ -14,26 +19,90 @@ class NCMFile:
     MAGIC_HEADER1 = 0x4e455443
     MAGIC_HEADER2 = 0x4d414446
 
-    def __init__(self, ncm_path: str):
-        self.path = os.path.abspath(ncm_path)
+    def __init__(self, source: NCMSource, name: Optional[str] = None):
+        """
+        source 可以是文件路径、bytes/bytearray/memoryview，或者一个可读的文件对象
+        (不要求可 seek)。name 用于非路径输入时的文件名和扩展名校验。
+        """
+        self.fd: Optional[BinaryIO] = None
+        self.valid: bool = False
+        self._owns_fd = False
+        self._pos = 0   # 相对于 NCM 数据起点的当前位置
+        self._base = 0  # NCM 数据在文件对象中的起点
+        self.buffer_size = 8192  # 读取音乐数据的缓冲区大小
+        self.io_policy = IOPolicy()  # 页缓存策略，默认不做任何提示
+        self.digest = None  # 读取时顺带计算的源文件摘要 (hashlib 风格的对象)
+
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.path.abspath(source)
+            self.fd = open(self.path, 'rb')
+            self._owns_fd = True
+        else:
+            self.path = os.path.abspath(name) if name else ''
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                self.fd = BytesIO(source)
+                self._owns_fd = True
+            else:
+                self.fd = source
+                if self.seekable:
+                    self._base = source.tell()
+
         self.file_dir = os.path.dirname(self.path)
         self.file_name = os.path.basename(self.path)
         self.ext = os.path.splitext(self.path)[1]
-        self.fd: Optional[int] = None
-        self.valid: bool = False
-        
+
         # 数据部分
         self.key = Data()
         self.meta = Data()
         self.cover = Data()
         self.music = Data()
-        
-        # 打开文件
-        self.fd = open(self.path, 'rb')
+
+    @property
+    def seekable(self) -> bool:
+        """数据源是否支持随机访问"""
+        try:
+            return self.fd.seekable()
+        except AttributeError:
+            return False
+
+    def _read(self, size: int) -> bytes:
+        """读取数据并记录当前位置"""
+        data = self.fd.read(size)
+        self._pos += len(data)
+        if self.digest is not None:
+            self.digest.update(data)
+        return data
+
+    def _read_exact(self, size: int) -> bytes:
+        """读取指定长度的数据，流式数据源可能一次读不满"""
+        data = self._read(size)
+        while len(data) < size:
+            chunk = self._read(size - len(data))
+            if not chunk:
+                raise NCMError("文件数据不完整")
+            data += chunk
+        return data
+
+    def _seek(self, offset: int) -> None:
+        """
+        定位到指定偏移，不可 seek 的数据源只能向前跳过。
+        计算摘要时向前跳过的字节也要读取，回退则放弃摘要
+        """
+        if offset == self._pos:
+            return
+        if offset > self._pos and (self.digest is not None or not self.seekable):
+            self._read_exact(offset - self._pos)
+        elif self.seekable:
+            self.fd.seek(self._base + offset)
+            self._pos = offset
+            self.digest = None
+        else:
+            raise NCMError("流式数据源不支持回退读取")
 
     def validate(self) -> None:
         """验证文件格式"""
-        if self.ext.lower() != '.ncm':
+        # 只有带文件名的输入才检查扩展名
+        if self.path and self.ext.lower() != '.ncm':
             raise NCMExtError("文件扩展名必须是.ncm")
         
         self.check_header()
@@ -41,18 +110,20 @@ class NCMFile:
 
     def check_header(self) -> None:
         """检查文件魔数头"""
-        self.fd.seek(0)
-        m1 = struct.unpack('<I', self.fd.read(4))[0]
-        m2 = struct.unpack('<I', self.fd.read(4))[0]
+        self._seek(0)
+        header = self._read(8)
+        if len(header) < 8:
+            raise NCMMagicHeaderError("文件头不匹配")
+        m1, m2 = struct.unpack('<II', header)
         
         if m1 != self.MAGIC_HEADER1 or m2 != self.MAGIC_HEADER2:
             raise NCMMagicHeaderError("文件头不匹配")
 
     def _get_data(self, offset: int) -> Tuple[bytes, int]:
         """读取数据块"""
-        self.fd.seek(offset)
-        length = struct.unpack('<I', self.fd.read(4))[0]
-        data = self.fd.read(length)
+        self._seek(offset)
+        length = struct.unpack('<I', self._read_exact(4))[0]
+        data = self._read_exact(length)
         return data, length
 
     def get_key(self) -> None:
@@ -75,76 +146,109 @@ class NCMFile:
         self.cover.length = length
         self.cover.detail = data
 
-    # def get_music_data(self) -> None:
-    #     """获取音乐数据"""
-    #     offset = 10 + 4 + self.key.length + 4 + self.meta.length + 9 + 4 + self.cover.length
-    #     self.fd.seek(offset)
-        
-    #     self.music.detail = b''
-    #     while True:
-    #         chunk = self.fd.read(1024)
-    #         if not chunk:
-    #             break
-    #         self.music.detail += chunk
-    #         self.music.length += len(chunk)
+    @property
+    def music_offset(self) -> int:
+        """音乐数据在文件中的起始偏移"""
+        return 10 + 4 + self.key.length + 4 + self.meta.length + 9 + 4 + self.cover.length
+
+    def _remaining_size(self) -> Optional[int]:
+        """音乐数据的剩余大小，流式数据源返回 None"""
+        if not self.seekable:
+            return None
+        current_pos = self.fd.tell()
+        self.fd.seek(0, 2)  # 移动到文件末尾
+        file_size = self.fd.tell()
+        self.fd.seek(current_pos)  # 回到之前的位置
+        return file_size - current_pos
 
     def get_music_data(self) -> None:
         """获取音乐数据"""
         # 计算正确的偏移量
-        offset = 10 + 4 + self.key.length + 4 + self.meta.length + 9 + 4 + self.cover.length
-        self.fd.seek(offset)
+        self._seek(self.music_offset)
         
         # 使用更高效的方式读取数据
         self.music.detail = bytearray()
         self.music.length = 0
         
-        # 获取文件剩余大小
-        current_pos = self.fd.tell()
-        self.fd.seek(0, 2)  # 移动到文件末尾
-        file_size = self.fd.tell()
-        remaining_size = file_size - current_pos
-        self.fd.seek(current_pos)  # 回到之前的位置
+        # 获取文件剩余大小，流式数据源读到结束为止
+        remaining_size = self._remaining_size()
 
         # 使用固定大小的缓冲区读取
-        buffer_size = 8192  # 8KB 缓冲区
+        buffer_size = self.buffer_size
         bytes_read = 0
+        self.io_policy.sequential(self.fd)
+        tracker = self.io_policy.tracker(self.fd)
         
-        print(f"开始读取音乐数据，总大小约 {remaining_size / 1024 / 1024:.2f} MB")
+        if remaining_size is not None:
+            print(f"开始读取音乐数据，总大小约 {remaining_size / 1024 / 1024:.2f} MB")
         
-        while bytes_read < remaining_size:
-            chunk_size = min(buffer_size, remaining_size - bytes_read)
-            chunk = self.fd.read(chunk_size)
+        while remaining_size is None or bytes_read < remaining_size:
+            chunk_size = buffer_size if remaining_size is None else min(buffer_size, remaining_size - bytes_read)
+            chunk = self._read(chunk_size)
             if not chunk:
                 break
             
             self.music.detail.extend(chunk)
             bytes_read += len(chunk)
+            tracker.update(self._base + self._pos)
             
             # 打印进度
-            if bytes_read % (1024 * 1024) < buffer_size:  # 每读取1MB打印一次
+            if remaining_size is not None and bytes_read % (1024 * 1024) < buffer_size:  # 每读取1MB打印一次
                 print(f"已读取: {bytes_read / 1024 / 1024:.2f} MB / {remaining_size / 1024 / 1024:.2f} MB")
         
         self.music.length = bytes_read
         print(f"音乐数据读取完成，总大小: {self.music.length / 1024 / 1024:.2f} MB")
 
-    def parse(self) -> None:
-        """解析整个NCM文件"""
+    def iter_music(self, chunk_size: int = 0x8000) -> Iterator[bytes]:
+        """
+        按块读取音乐数据而不整体缓存，用于流式转换。
+        除最后一块外，每块长度都是 chunk_size。
+        """
+        self._seek(self.music_offset)
+        self.music.length = 0
+        self.io_policy.sequential(self.fd)
+        tracker = self.io_policy.tracker(self.fd)
+        while True:
+            chunk = self._read(chunk_size)
+            # 流式数据源可能返回不足一块的数据，补齐以保持块边界对齐
+            while chunk and len(chunk) < chunk_size:
+                more = self._read(chunk_size - len(chunk))
+                if not more:
+                    break
+                chunk += more
+            if not chunk:
+                break
+            self.music.length += len(chunk)
+            tracker.update(self._base + self._pos)
+            yield chunk
+
+    def parse_header(self) -> None:
+        """只解析文件头部 (密钥、元数据、封面)，不读取音乐数据"""
         try:
             self.validate()
             self.get_key()
             self.get_meta()
             self.get_cover()
+        except Exception as e:
+            raise Exception(f"解析NCM文件失败: {str(e)}")
+
+    def parse(self) -> None:
+        """解析整个NCM文件"""
+        self.parse_header()
+        try:
             self.get_music_data()
         except Exception as e:
             raise Exception(f"解析NCM文件失败: {str(e)}")
 
     def close(self) -> None:
-        """关闭文件"""
-        if self.fd:
+        """关闭文件，外部传入的文件对象由调用方负责关闭"""
+        if self.fd and self._owns_fd:
+            # 源文件不会再被读取，释放它占用的页缓存
+            self.io_policy.drop(self.fd)
             self.fd.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
\ No newline at end of file
+        self.close()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from typing import List, Union
 
@@ -21,6 +22,13 @@ def dir_path(path: Union[str, Path]) -> str:
     """返回路径的目录部分"""
     return str(Path(path).parent)
 
+def file_size(path: Union[str, Path]) -> int:
+    """返回文件大小，文件不存在或无法访问时返回 0"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
 # 使用示例：
 if __name__ == "__main__":
     # 清理路径
@@ -1,8 +1,27 @@
 from abc import ABC, abstractmethod
 from typing import List
 
+# 首次转换时预留的填充块大小，之后修改标签只要不超过它就不会重写音频数据
+PADDING_RESERVE = 64 * 1024
+
+def reserve_padding(info) -> int:
+    """mutagen 填充回调：空间足够时原地修改，否则重新预留 PADDING_RESERVE"""
+    return info.padding if info.padding >= PADDING_RESERVE else PADDING_RESERVE
+
+def keep_padding(info) -> int:
+    """mutagen 填充回调：新标签放得下就保持文件布局不变 (原地更新)"""
+    return info.padding if info.padding >= 0 else PADDING_RESERVE
+
 class Tagger(ABC):
     """标签处理基类"""
+
+    # 保存时使用的填充策略，重新写标签时改为 keep_padding
+    padding = staticmethod(reserve_padding)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清除本工具写入的标签和封面 (其它标签保持不变)"""
+        pass
     
     @abstractmethod
     def set_cover(self, cover: bytes, mime: str) -> None:
@@ -0,0 +1,154 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, Optional, Set, Tuple
+
+from .utils import fetch_url, is_png
+from converter.converter import Meta
+
+# 封面处理策略
+COVER_EMBED = 'embed'    # 原样内嵌 (默认)
+COVER_RESIZE = 'resize'  # 每张专辑缩放/重新压缩一次后内嵌
+COVER_THUMB = 'thumb'    # 内嵌小尺寸缩略图
+COVER_FOLDER = 'folder'  # 每个专辑目录写一个 cover.jpg，不内嵌 (指定尺寸时也会缩放)
+COVER_POLICIES = (COVER_EMBED, COVER_RESIZE, COVER_THUMB, COVER_FOLDER)
+
+# 各策略默认的最大边长
+DEFAULT_SIZES = {COVER_RESIZE: 1200, COVER_THUMB: 300}
+JPEG_QUALITY = 85
+# 内存中最多保留的专辑封面数，输入通常按目录排列，同一专辑的曲目相邻
+CACHE_ALBUMS = 32
+
+def shrink_image(data: bytes, max_size: int) -> bytes:
+    """把图片缩放到最大边长不超过 max_size 并重新压缩为 JPEG，已经足够小的 JPEG 原样返回"""
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    if max(image.size) <= max_size and image.format == 'JPEG':
+        return data
+
+    image.thumbnail((max_size, max_size))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return output.getvalue()
+
+def cover_file_name(cover: bytes) -> str:
+    """专辑目录中封面文件的文件名"""
+    return 'cover.png' if is_png(cover) else 'cover.jpg'
+
+class CoverCache:
+    """
+    单次运行内按专辑缓存处理后的封面，同一张专辑的所有曲目共用一份结果，
+    包括从网络下载的封面
+    """
+
+    def __init__(self, policy: str = COVER_EMBED, size: Optional[int] = None):
+        self.policy = policy
+        self.size = size or DEFAULT_SIZES.get(policy, 0)
+        # 最近使用的专辑封面 (LRU)，大批量转换时不会把所有专辑的封面都留在内存中
+        self.covers: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.missing: Set[str] = set()  # 没有封面或下载失败的专辑，不再重试
+        self.folders: Dict[str, Optional[str]] = {}  # 目录 -> 目录封面所属的专辑
+        self.lock = threading.Lock()
+        self.key_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def embed(self) -> bool:
+        """是否把封面内嵌到音频文件中"""
+        return self.policy != COVER_FOLDER
+
+    def _key(self, meta: Meta, cover: Optional[bytes]) -> Optional[str]:
+        if meta.album and meta.album.id:
+            return f"album:{meta.album.id}"
+        if cover:
+            return f"sha1:{hashlib.sha1(cover).hexdigest()}"
+        if meta.album and meta.album.cover_url:
+            return f"url:{meta.album.cover_url}"
+        return None
+
+    def _process(self, meta: Meta, cover: Optional[bytes]) -> Optional[bytes]:
+        if not cover and meta.album and meta.album.cover_url:
+            print(f"从URL下载封面: {meta.album.cover_url}")
+            cover = fetch_url(meta.album.cover_url)
+        if cover and self.size and self.policy != COVER_EMBED:
+            try:
+                cover = shrink_image(cover, self.size)
+            except Exception as e:
+                print(f"处理封面失败，使用原图: {str(e)}")
+        return cover
+
+    def get(self, meta: Meta, cover: Optional[bytes]) -> Optional[bytes]:
+        """返回按策略处理后的封面，同一专辑只处理 (和下载) 一次"""
+        if self.policy == COVER_EMBED and cover:
+            return cover
+
+        key = self._key(meta, cover)
+        if key is None:
+            return cover
+
+        with self.lock:
+            found, processed = self._lookup(key)
+            if found:
+                return processed
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        # 同一专辑的其它曲目等待第一次处理完成
+        with key_lock:
+            with self.lock:
+                found, processed = self._lookup(key)
+                if found:
+                    return processed
+            processed = self._process(meta, cover)
+            with self.lock:
+                if processed:
+                    self.covers[key] = processed
+                    if len(self.covers) > CACHE_ALBUMS:
+                        self.covers.popitem(last=False)
+                else:
+                    self.missing.add(key)
+                self.key_locks.pop(key, None)
+            return processed
+
+    def _lookup(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        """在持有 self.lock 时查找缓存，返回 (是否命中, 封面)"""
+        if key in self.missing:
+            return True, None
+        if key in self.covers:
+            self.covers.move_to_end(key)
+            return True, self.covers[key]
+        return False, None
+
+    def claim_folder(self, directory: str, meta: Meta, cover: Optional[bytes]) -> Tuple[bool, bool]:
+        """
+        登记目录的专辑封面，返回 (是否需要写入目录封面, 是否需要改为内嵌)。
+        目录第一次登记时属于该曲目的专辑；之后其它专辑的曲目 (例如 -o 把所有输出
+        放在同一个目录) 不能共用目录封面，改为内嵌各自的封面
+        """
+        key = self._key(meta, cover)
+        with self.lock:
+            if directory not in self.folders:
+                self.folders[directory] = key
+                return True, False
+            return False, self.folders[directory] != key
+
+    def write_folder_cover(self, directory: str, meta: Meta,
+                           cover: Optional[bytes]) -> Tuple[Optional[str], bool]:
+        """
+        在专辑目录写入封面文件，每个目录只写一次，已存在时不覆盖。
+        返回 (写入的路径, 是否需要改为内嵌)
+        """
+        if not cover:
+            return None, False
+        claimed, embed = self.claim_folder(directory, meta, cover)
+        if not claimed:
+            return None, embed
+        path = os.path.join(directory, cover_file_name(cover))
+        if os.path.exists(path):
+            return None, False
+        with open(path, 'wb') as f:
+            f.write(cover)
+        return path, False
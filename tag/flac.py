@@ -1,11 +1,22 @@
 from mutagen.flac import FLAC, Picture
 from .base import Tagger
-from typing import List
+from typing import List, Union, BinaryIO
 
 class FLACTagger(Tagger):
-    def __init__(self, path: str):
+    def __init__(self, path: Union[str, BinaryIO]):
+        # path 也可以是可读写、可 seek 的文件对象
+        self.target = path
+        if not isinstance(path, str):
+            path.seek(0)
         self.tag = FLAC(path)
             
+    def clear(self) -> None:
+        self.tag.clear_pictures()
+        if self.tag.tags is not None:
+            for key in ('title', 'album', 'artist', 'comment'):
+                if key in self.tag.tags:
+                    del self.tag.tags[key]
+
     def set_cover(self, cover: bytes, mime: str) -> None:
         picture = Picture()
         picture.type = 3  # 封面图片
@@ -37,4 +48,6 @@ class FLACTagger(Tagger):
         self.tag['comment'] = comment
         
     def save(self) -> None:
-        self.tag.save()
+        if not isinstance(self.target, str):
+            self.target.seek(0)
+        self.tag.save(self.target, padding=self.padding)
@@ -1,14 +1,22 @@
 from mutagen.id3 import ID3, APIC, TIT2, TALB, TPE1, COMM
 from .base import Tagger
-from typing import List
+from typing import List, Union, BinaryIO
 
 class MP3Tagger(Tagger):
-    def __init__(self, path: str):
+    def __init__(self, path: Union[str, BinaryIO]):
+        # path 也可以是可读写、可 seek 的文件对象
+        self.target = path
+        if not isinstance(path, str):
+            path.seek(0)
         try:
             self.tag = ID3(path)
         except:
             self.tag = ID3()
             
+    def clear(self) -> None:
+        for frame in ('APIC', 'TIT2', 'TALB', 'TPE1', 'COMM'):
+            self.tag.delall(frame)
+
     def set_cover(self, cover: bytes, mime: str) -> None:
         self.tag.add(
             APIC(
@@ -44,4 +52,6 @@ class MP3Tagger(Tagger):
         self.tag.add(COMM(encoding=3, lang='XXX', desc='', text=comment))
         
     def save(self) -> None:
-        self.tag.save()
+        if not isinstance(self.target, str):
+            self.target.seek(0)
+        self.tag.save(self.target, padding=self.padding)
@@ -0,0 +1,31 @@
+import json
+from typing import List, Optional
+from .utils import is_png
+from converter.converter import Meta
+
+def meta_to_dict(meta: Meta) -> dict:
+    """将元数据转换为可以写入 JSON 的字典"""
+    data = json.loads(meta.to_json())
+    if meta.album:
+        data.update(json.loads(meta.album.to_json()))
+    return data
+
+def write_sidecar(output_path: str, meta: Meta, cover: Optional[bytes]) -> List[str]:
+    """
+    在 output_path (不含扩展名) 旁写出 .json 元数据和封面图片，
+    不依赖 mutagen，返回写入的文件列表
+    """
+    written = []
+
+    json_path = f"{output_path}.json"
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(meta_to_dict(meta), f, ensure_ascii=False, indent=2)
+    written.append(json_path)
+
+    if cover:
+        cover_path = f"{output_path}.{'png' if is_png(cover) else 'jpg'}"
+        with open(cover_path, 'wb') as f:
+            f.write(cover)
+        written.append(cover_path)
+
+    return written
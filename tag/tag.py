@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Union, BinaryIO
 from .base import Tagger
 from .mp3 import MP3Tagger
 from .flac import FLACTagger
@@ -9,7 +9,7 @@ class TaggingError(Exception):
     """标签处理错误"""
     pass
 
-def create_tagger(path: str, format: str) -> Tagger:
+def create_tagger(path: Union[str, BinaryIO], format: str) -> Tagger:
     """创建对应格式的标签处理器"""
     format = format.lower()
     if format == 'mp3':
@@ -19,23 +19,30 @@ def create_tagger(path: str, format: str) -> Tagger:
     else:
         raise TaggingError(f"不支持的格式: {format}")
 
-def tag_audio_file(tagger: Tagger, img_data: Optional[bytes], meta: Meta) -> None:
-    """处理音频文件标签"""
+def tag_audio_file(tagger: Tagger, img_data: Optional[bytes], meta: Meta,
+                   embed_cover: bool = True, fetch: bool = True) -> None:
+    """
+    处理音频文件标签，embed_cover 为 False 时不内嵌也不下载封面。
+    fetch 为 False 时没有封面数据也不再下载 (调用方已经通过 CoverCache 尝试过)，直接使用URL作为封面链接
+    """
     try:
         # 处理封面图片
-        if img_data and len(img_data) > 0:  # 确保有封面数据
+        if not embed_cover:
+            pass
+        elif img_data and len(img_data) > 0:  # 确保有封面数据
             mime = get_image_mime(img_data)
             print(f"添加封面图片: {mime}, 大小: {len(img_data)/1024:.1f}KB")
             tagger.set_cover(img_data, mime)
         elif meta.album and meta.album.cover_url:
-            print(f"从URL下载封面: {meta.album.cover_url}")
-            img_data = fetch_url(meta.album.cover_url)
+            if fetch:
+                print(f"从URL下载封面: {meta.album.cover_url}")
+                img_data = fetch_url(meta.album.cover_url)
             if img_data:
                 mime = get_image_mime(img_data)
                 print(f"添加下载的封面: {mime}, 大小: {len(img_data)/1024:.1f}KB")
                 tagger.set_cover(img_data, mime)
             else:
-                print("封面下载失败，使用URL作为封面链接")
+                print("没有可用的封面，使用URL作为封面链接")
                 tagger.set_cover_url(meta.album.cover_url)
         
         # 设置其他标签
@@ -1,12 +1,22 @@
-import requests
+import threading
 from typing import Optional
-from PIL import Image
 from io import BytesIO
 
+# 每个线程复用一个 HTTP 会话，保持连接
+_local = threading.local()
+
+def get_session():
+    """获取当前线程的 requests 会话"""
+    import requests  # 只有需要下载封面时才导入
+
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
 def fetch_url(url: str, timeout: int = 30) -> Optional[bytes]:
     """从URL获取数据"""
     try:
-        response = requests.get(url, timeout=timeout)
+        response = get_session().get(url, timeout=timeout)
         response.raise_for_status()
         return response.content
     except Exception as e:
@@ -20,6 +30,8 @@ def is_png(data: bytes) -> bool:
 
 def get_image_mime(data: bytes) -> str:
     """获取图片MIME类型"""
+    from PIL import Image
+
     try:
         image = Image.open(BytesIO(data))
         return f"image/{image.format.lower()}"
@@ -0,0 +1,47 @@
+import io
+import tarfile
+import zipfile
+import pytest
+from core import NCMConverter, archive_name
+from batch.archive import ArchiveWriter, ARCHIVE_TAR, ARCHIVE_ZIP
+from batch.shard import shard_key
+from tests.utils import build_ncm, make_flac, make_mp3, SAMPLE_META
+
+def _read_members(data: bytes, format: str) -> dict:
+    if format == ARCHIVE_ZIP:
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            return {name: z.read(name) for name in z.namelist()}
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r') as t:
+        return {m.name: t.extractfile(m).read() for m in t.getmembers()}
+
+@pytest.mark.parametrize('format', [ARCHIVE_TAR, ARCHIVE_ZIP])
+def test_convert_to_archive(tmp_path, format):
+    """测试转换结果按相对路径写入归档，成员内容与 convert_stream 的输出一致"""
+    sources = {
+        tmp_path / "歌手" / "专辑" / "a.ncm": build_ncm(make_flac(50000), SAMPLE_META),
+        tmp_path / "b.ncm": build_ncm(make_mp3(50000), dict(SAMPLE_META, format='mp3')),
+    }
+    for path, data in sources.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    conv = NCMConverter()
+    target = io.BytesIO()
+    with ArchiveWriter(target, format) as archive:
+        for path in sources:
+            conv.convert_to_archive(str(path), archive_name(shard_key(str(path), str(tmp_path))), archive)
+
+    members = _read_members(target.getvalue(), format)
+    assert sorted(members) == ['b.mp3', '歌手/专辑/a.flac']
+    for path, data in sources.items():
+        expected = io.BytesIO()
+        conv.convert_stream(data, expected)
+        name = 'b.mp3' if path.name == 'b.ncm' else '歌手/专辑/a.flac'
+        assert members[name] == expected.getvalue()
+
+def test_archive_name():
+    assert archive_name('/歌手/专辑/a.ncm') == '歌手/专辑/a'
+    assert archive_name('b.NCM') == 'b'
+    # 不允许成员路径跳出解压目录
+    assert archive_name('../x.ncm') == 'x'
+    assert archive_name('a/../../b/./c.ncm') == 'b/c'
@@ -0,0 +1,68 @@
+import pytest
+import batch.autotune as autotune
+from batch.autotune import Autotuner, DEFAULT_BLOCK_SIZE
+
+MB = 1024 * 1024
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的时钟，测量时间由测试决定"""
+    now = [0.0]
+    monkeypatch.setattr(autotune.time, 'monotonic', lambda: now[0])
+    return now
+
+def _run_trial(tuner, clock, throughput):
+    """按给定吞吐量 (MB/s) 完成当前测量需要的全部任务，每个任务 1MB"""
+    trial, workers, block_size = tuner.current()
+    # 第一个任务不计入测量，即使它非常慢
+    clock[0] += 100
+    tuner.record(trial, MB)
+    count = max(tuner.window, workers * 2)
+    clock[0] += count / throughput
+    for _ in range(count):
+        tuner.record(trial, MB)
+    return workers, block_size
+
+def test_autotuner_phases(clock):
+    """测试先调整并发数，吞吐量下降后停止，再在选定的并发数下比较块大小"""
+    tuner = Autotuner(max_workers=8, window=2)
+    assert _run_trial(tuner, clock, 10) == (1, DEFAULT_BLOCK_SIZE)
+    assert _run_trial(tuner, clock, 20) == (2, DEFAULT_BLOCK_SIZE)
+    # 4 线程变慢，不再尝试 8 线程
+    assert _run_trial(tuner, clock, 15) == (4, DEFAULT_BLOCK_SIZE)
+    with pytest.raises(RuntimeError):
+        tuner.profile()
+
+    results = {}
+    while not tuner.done:
+        workers, block_size = tuner.current()[1:]
+        assert workers == 2
+        results[block_size] = 30 if block_size == 0x100000 else 5
+        _run_trial(tuner, clock, results[block_size])
+    assert sorted(results) == sorted(b for b in autotune.BLOCK_SIZES if b != DEFAULT_BLOCK_SIZE)
+
+    profile = tuner.profile()
+    assert (profile['workers'], profile['block_size']) == (2, 0x100000)
+    assert profile['throughput'] == pytest.approx(30)
+
+def test_autotuner_ignores_stale_trials(clock):
+    """测试上一组测量中提交、在切换之后才完成的任务不计入新的测量"""
+    tuner = Autotuner(max_workers=2, window=2)
+    first = tuner.current()[0]
+    _run_trial(tuner, clock, 10)
+    second = tuner.current()[0]
+    assert second is not first
+    tuner.record(first, MB)
+    assert second.finished == 0
+
+def test_autotuner_discards_first_task(clock):
+    """测试每组测量的第一个任务 (承担 JIT 编译等开销) 不计入吞吐量"""
+    tuner = Autotuner(max_workers=1, window=2)
+    trial = tuner.current()[0]
+    clock[0] += 50
+    tuner.record(trial, MB)
+    assert trial.finished == 0
+    clock[0] += 0.2
+    tuner.record(trial, MB)
+    tuner.record(trial, MB)
+    assert trial.throughput == pytest.approx(10)
@@ -62,3 +62,105 @@ def test_handle_all(converter):
     assert converter.key_data is not None
     assert converter.meta_data is not None
     assert converter.music_data is not None
+
+def test_convert_stream_in_memory():
+    """测试内存数据到文件对象的完整转换"""
+    from io import BytesIO
+    from core import NCMConverter
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    music = make_flac(100000)
+    sink = BytesIO()
+    meta = NCMConverter().convert_stream(build_ncm(music, SAMPLE_META), sink, add_tags=False)
+    assert meta.format == 'flac'
+    assert sink.getvalue() == music
+
+def test_sniff_format():
+    """测试根据解密后的开头数据判断格式"""
+    from converter.utils import sniff_format
+    from tests.utils import make_flac, make_mp3
+
+    id3 = b'ID3\x04\x00\x00\x00\x00\x00\x0a' + bytes(10)
+    assert sniff_format(make_flac()) == 'flac'
+    assert sniff_format(make_mp3()) == 'mp3'
+    assert sniff_format(id3 + make_mp3()) == 'mp3'
+    assert sniff_format(id3 + make_flac()) == 'flac'
+    assert sniff_format(b'RIFF\x00\x00') is None
+
+def test_detect_format_overrides_meta():
+    """测试元数据缺失或错误时使用实际数据的格式"""
+    from tests.utils import build_ncm, make_mp3, SAMPLE_META
+
+    music = make_mp3(100000)
+    for meta in (None, SAMPLE_META):
+        ncm = NCMFile(build_ncm(music, meta))
+        ncm.parse_header()
+        conv = Converter(ncm)
+        assert conv.detect_format() == 'mp3'
+        assert conv.meta_data.format == 'mp3'
+        # 预先解密的第一块不会丢失
+        assert b''.join(conv.iter_music()) == music
+
+def test_low_memory_fallback(tmp_path):
+    """测试超出内存上限的文件改为流式处理，输出与普通路径一致"""
+    from core import NCMConverter, MODE_DECRYPT, MODE_FULL
+    from batch.memory import MemoryBudget
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    music = make_flac(300000)
+    source = tmp_path / "big.ncm"
+    source.write_bytes(build_ncm(music, SAMPLE_META))
+
+    conv = NCMConverter()
+    conv.memory_budget = MemoryBudget(128 * 1024)
+    with conv.reserve_memory(str(source), MODE_DECRYPT) as low_memory:
+        assert low_memory
+        assert conv.memory_budget.used <= 128 * 1024
+    assert conv.memory_budget.used == 0
+
+    output = conv.convert_file(str(source), str(tmp_path / "out"), mode=MODE_DECRYPT)
+    assert Path(output).read_bytes() == music
+    assert conv.memory_budget.used == 0
+
+    # 需要校验和时在内存中添加标签，同时持有加密数据和输出缓冲区
+    conv.memory_budget = MemoryBudget(1 << 30)
+    conv.checksum = 'sha256'
+    with conv.reserve_memory(str(source), MODE_FULL) as low_memory:
+        assert not low_memory
+        assert conv.memory_budget.used == 2 * source.stat().st_size
+    with conv.reserve_memory(str(source), MODE_DECRYPT):
+        assert conv.memory_budget.used == source.stat().st_size
+
+def test_inline_checksums(tmp_path):
+    """测试写入时计算的摘要与源文件和最终输出文件 (含标签) 一致"""
+    import json
+    import hashlib
+    from core import NCMConverter
+    from batch.manifest import Manifest
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    source = tmp_path / "song.ncm"
+    source.write_bytes(build_ncm(make_flac(100000), SAMPLE_META))
+
+    conv = NCMConverter()
+    conv.checksum = 'sha256'
+    conv.manifest = Manifest(str(tmp_path / "checksums.jsonl"), 'sha256')
+    output = conv.convert_file(str(source), str(tmp_path / "out"))
+    conv.manifest.close()
+
+    record = json.loads((tmp_path / "checksums.jsonl").read_text(encoding='utf-8'))
+    assert record['source_digest'] == hashlib.sha256(source.read_bytes()).hexdigest()
+    assert record['output_digest'] == hashlib.sha256(Path(output).read_bytes()).hexdigest()
+    assert record['scope'] == 'file'
+
+def test_warmup_covers_real_inputs(tmp_path):
+    """测试预热后转换真实文件 (只读数组) 不再触发新的 JIT 编译"""
+    from core import NCMConverter
+    from converter.cipher import warmup, process_chunk, build_box
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    warmup()
+    compiled = (len(process_chunk.signatures), len(build_box.signatures))
+    (tmp_path / "a.ncm").write_bytes(build_ncm(make_flac(100000), SAMPLE_META))
+    NCMConverter().convert_file(str(tmp_path / "a.ncm"), str(tmp_path), add_tags=False)
+    assert (len(process_chunk.signatures), len(build_box.signatures)) == compiled
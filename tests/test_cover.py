@@ -0,0 +1,82 @@
+from io import BytesIO
+from PIL import Image
+from tag.cover import CoverCache, COVER_THUMB, COVER_FOLDER
+from converter.converter import Meta, Album
+
+def _meta(album_id: int) -> Meta:
+    album = Album(id=album_id, name='专辑', cover_url='')
+    return Meta(id=1, name='歌曲', album=album, artists=[], bit_rate=0, duration=0, format='flac')
+
+def _png(size: int) -> bytes:
+    output = BytesIO()
+    Image.new('RGB', (size, size), (10, 20, 30)).save(output, format='PNG')
+    return output.getvalue()
+
+def test_thumb_processed_once_per_album():
+    """测试同一专辑的封面只处理一次并缩放到指定尺寸"""
+    cache = CoverCache(COVER_THUMB, 100)
+    first = cache.get(_meta(1), _png(800))
+    assert cache.get(_meta(1), _png(800)) is first
+    assert Image.open(BytesIO(first)).size == (100, 100)
+    assert cache.get(_meta(2), _png(50)) is not first
+
+def test_folder_cover_written_once(tmp_path):
+    """测试每个目录只写一次专辑封面，且不内嵌"""
+    cache = CoverCache(COVER_FOLDER)
+    assert not cache.embed
+    cover = _png(50)
+    assert cache.write_folder_cover(str(tmp_path), _meta(1), cover) == (str(tmp_path / 'cover.png'), False)
+    assert cache.write_folder_cover(str(tmp_path), _meta(1), cover) == (None, False)
+
+def test_folder_cover_two_albums_in_one_directory(tmp_path):
+    """测试两张专辑输出到同一目录时，第二张专辑的封面改为内嵌而不是丢失"""
+    from mutagen.flac import FLAC
+    from core import NCMConverter
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    cover_x, cover_y = _png(40), _png(60)
+    (tmp_path / "x.ncm").write_bytes(build_ncm(make_flac(), dict(SAMPLE_META, albumId=1), cover_x))
+    (tmp_path / "y.ncm").write_bytes(build_ncm(make_flac(), dict(SAMPLE_META, albumId=2), cover_y))
+
+    conv = NCMConverter()
+    conv.cover_cache = CoverCache(COVER_FOLDER)
+    out = tmp_path / "out"
+    for name in ("x", "y"):
+        conv.convert_file(str(tmp_path / f"{name}.ncm"), str(out))
+
+    assert (out / "cover.png").read_bytes() == cover_x
+    assert not FLAC(str(out / "x.flac")).pictures
+    assert [p.data for p in FLAC(str(out / "y.flac")).pictures] == [cover_y]
+
+def test_failed_cover_fetched_once(tmp_path, monkeypatch):
+    """测试封面下载失败时同一专辑只下载一次，其余曲目直接使用URL"""
+    import tag.cover
+    import tag.tag
+    from core import NCMConverter
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    calls = []
+    def fetch(url):
+        calls.append(url)
+        return None
+    monkeypatch.setattr(tag.cover, 'fetch_url', fetch)
+    monkeypatch.setattr(tag.tag, 'fetch_url', fetch)
+
+    meta = dict(SAMPLE_META, albumPic='http://example.com/c.jpg')
+    conv = NCMConverter()
+    for i in range(5):
+        (tmp_path / f"{i}.ncm").write_bytes(build_ncm(make_flac(), meta))
+        assert conv.convert_file(str(tmp_path / f"{i}.ncm"), str(tmp_path / "out"))
+    assert calls == ['http://example.com/c.jpg']
+
+def test_cover_cache_bounded(monkeypatch):
+    """测试缓存只保留最近使用的专辑封面"""
+    import tag.cover
+    monkeypatch.setattr(tag.cover, 'CACHE_ALBUMS', 2)
+    cache = CoverCache(COVER_THUMB, 10)
+    first = cache.get(_meta(1), _png(50))
+    cache.get(_meta(2), _png(50))
+    assert cache.get(_meta(1), _png(50)) is first
+    cache.get(_meta(3), _png(50))
+    assert list(cache.covers) == ['album:1', 'album:3']
+    assert not cache.key_locks
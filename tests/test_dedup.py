@@ -0,0 +1,87 @@
+import pytest
+from batch.dedup import DedupIndex, track_key, link_output
+from tests.utils import build_ncm, make_flac, make_mp3, SAMPLE_META
+
+def test_dedup_groups_identical_tracks(tmp_path):
+    """测试相同曲目得到相同的去重键并被分到同一组"""
+    same = build_ncm(make_flac(200000), SAMPLE_META)
+    other = build_ncm(make_mp3(200000), SAMPLE_META)
+    files = []
+    for name, data in [('a.ncm', same), ('b.ncm', other), ('c.ncm', same)]:
+        path = tmp_path / name
+        path.write_bytes(data)
+        files.append(str(path))
+
+    keys = [track_key(f) for f in files]
+    assert keys[0] == keys[2] != keys[1]
+
+    groups = DedupIndex().group(files, keys)
+    assert groups == [[files[0], files[2]], [files[1]]]
+
+def test_link_output_fallback(tmp_path):
+    """测试 reflink 不可用时退回硬链接或复制"""
+    src = tmp_path / 'a.flac'
+    src.write_bytes(b'fLaC' + bytes(100))
+    dst = tmp_path / 'sub' / 'b.flac'
+    method = link_output(str(src), str(dst))
+    assert method in ('reflink', 'hard', 'copy')
+    assert dst.read_bytes() == src.read_bytes()
+
+def test_convert_group_reuses_earlier_output(tmp_path):
+    """测试同一去重键之前已经转换过时，整组直接链接到已有的输出而不再转换"""
+    from core import NCMConverter
+
+    data = build_ncm(make_flac(200000), SAMPLE_META)
+    for name in ('a.ncm', 'b.ncm'):
+        (tmp_path / name).write_bytes(data)
+    out = tmp_path / 'out'
+    converter = NCMConverter()
+    key = track_key(str(tmp_path / 'a.ncm'))
+    first = converter.convert_group([str(tmp_path / 'a.ncm')], key, str(out))
+    assert converter.dedup_index.get(key) == first
+
+    converter.convert_file = lambda *args, **kwargs: pytest.fail("不应再次转换")
+    assert converter.convert_group([str(tmp_path / 'b.ncm')], key, str(out)) == first
+    assert (out / 'b.flac').read_bytes() == (out / 'a.flac').read_bytes()
+
+def test_convert_group_links_failed_files(tmp_path):
+    """测试组内第一个文件转换失败、后面的成功时，失败的文件也得到链接的输出"""
+    from core import NCMConverter
+
+    data = build_ncm(make_flac(200000), SAMPLE_META)
+    files = []
+    for name in ('a.ncm', 'b.ncm', 'c.ncm'):
+        (tmp_path / name).write_bytes(data)
+        files.append(str(tmp_path / name))
+    out = tmp_path / 'out'
+    converter = NCMConverter()
+    convert_file = converter.convert_file
+    converter.convert_file = lambda path, *args: None if path == files[0] else convert_file(path, *args)
+    assert converter.convert_group(files, None, str(out)) == str(out / 'b.flac')
+    assert sorted(p.name for p in out.iterdir()) == ['a.flac', 'b.flac', 'c.flac']
+
+def test_linked_duplicates_in_manifest(tmp_path):
+    """测试链接得到的重复文件也写入校验和清单，沿用已转换输出的摘要"""
+    import json
+    from core import NCMConverter
+    from batch.manifest import Manifest
+
+    data = build_ncm(make_flac(200000), SAMPLE_META)
+    files = []
+    for name in ('a.ncm', 'b.ncm'):
+        (tmp_path / name).write_bytes(data)
+        files.append(str(tmp_path / name))
+    out = tmp_path / 'out'
+    converter = NCMConverter()
+    converter.checksum = 'sha256'
+    converter.manifest = Manifest(str(tmp_path / 'checksums.jsonl'), 'sha256')
+    converter.output_checksums = {}
+    converter.convert_group(files, None, str(out))
+    converter.close_manifest()
+
+    records = [json.loads(line) for line in open(tmp_path / 'checksums.jsonl', encoding='utf-8')]
+    assert [r['source'] for r in records] == files
+    assert [r['output'] for r in records] == [str(out / 'a.flac'), str(out / 'b.flac')]
+    assert records[1]['output_digest'] == records[0]['output_digest'] is not None
+    assert records[1]['output_size'] == records[0]['output_size']
+    assert records[1]['source_digest'] is None
@@ -0,0 +1,23 @@
+import os
+import pytest
+from batch.device import DeviceLimiter, device_of, parse_device_limit, DEVICE_KINDS
+
+def test_parse_device_limit():
+    assert parse_device_limit('hdd=2') == ('hdd', 2)
+    assert parse_device_limit('/mnt/a=b=1') == ('/mnt/a=b', 1)
+    for spec in ('hdd', '=1', 'hdd=x', 'hdd=-1'):
+        with pytest.raises(ValueError):
+            parse_device_limit(spec)
+
+def test_device_limiter(tmp_path):
+    """测试按路径配置的并发数，以及输出路径不存在时使用上级目录所在的设备"""
+    missing = str(tmp_path / "out" / "a.flac")
+    assert device_of(missing) == os.stat(tmp_path).st_dev
+
+    limiter = DeviceLimiter([f"{tmp_path}=1"])
+    dev = device_of(str(tmp_path))
+    # 同一设备的多个路径只占用一个名额，不会死锁
+    with limiter.access(str(tmp_path), missing):
+        assert limiter.semaphores[dev].acquire(blocking=False) is False
+    assert limiter.kinds[dev] in DEVICE_KINDS
+    assert limiter.semaphores[dev].acquire(blocking=False) is True
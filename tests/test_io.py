@@ -0,0 +1,51 @@
+import pytest
+from ncm.io import IOPolicy, DropBehind, IO_NOCACHE, DROP_WINDOW, PAGE_SIZE, parse_size, align
+
+class _RecordingPolicy(IOPolicy):
+    """记录 drop 调用而不真正调用 posix_fadvise"""
+
+    def __init__(self):
+        super().__init__(IO_NOCACHE)
+        self.drops = []
+
+    def drop(self, fd, offset=0, length=0):
+        self.drops.append((offset, length))
+
+def test_parse_size_and_align():
+    assert parse_size('4096') == 4096
+    assert parse_size('512k') == 512 * 1024
+    assert parse_size('4M') == 4 * 1024 * 1024
+    assert parse_size('1.5G') == int(1.5 * 1024 ** 3)
+    assert parse_size('2MB') == 2 * 1024 * 1024
+    with pytest.raises(ValueError):
+        parse_size('abc')
+    assert align(1) == PAGE_SIZE
+    assert align(PAGE_SIZE) == PAGE_SIZE
+    assert align(PAGE_SIZE + 1) == 2 * PAGE_SIZE
+
+def test_drop_behind_read_window():
+    """测试读取时每满一个窗口释放一次刚读过的范围"""
+    policy = _RecordingPolicy()
+    tracker = DropBehind(policy, None)
+    tracker.update(DROP_WINDOW - 1)
+    assert policy.drops == []
+    tracker.update(DROP_WINDOW)
+    tracker.update(DROP_WINDOW + 100)
+    tracker.update(2 * DROP_WINDOW + 100)
+    assert policy.drops == [(0, DROP_WINDOW), (DROP_WINDOW, DROP_WINDOW + 100)]
+    tracker.finish()
+    assert policy.drops[-1] == (0, 0)
+
+def test_drop_behind_write_window():
+    """测试写入时把上一个窗口再提示一次，让回写完成的脏页也能释放"""
+    policy = _RecordingPolicy()
+    tracker = DropBehind(policy, None, writing=True)
+    tracker.update(DROP_WINDOW)
+    tracker.update(2 * DROP_WINDOW)
+    assert policy.drops == [(0, DROP_WINDOW), (0, 2 * DROP_WINDOW)]
+
+def test_drop_behind_disabled():
+    policy = IOPolicy()
+    tracker = DropBehind(policy, None)
+    tracker.update(10 * DROP_WINDOW)
+    assert tracker.dropped == 0
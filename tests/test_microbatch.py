@@ -0,0 +1,10 @@
+from batch.microbatch import make_batches
+
+def test_make_batches():
+    """测试小文件按总字节数合并，大文件单独成批且保持顺序"""
+    files = ['a', 'b', 'c', 'big', 'd', 'e']
+    sizes = {'a': 4, 'b': 4, 'c': 4, 'big': 20, 'd': 4, 'e': 4}
+    assert make_batches(files, sizes, 8) == [['a', 'b'], ['big'], ['c', 'd'], ['e']]
+    assert make_batches(files, sizes, 0) == [[f] for f in files]
+    # 线程数较多时批大小变小，保证每个线程都有任务
+    assert make_batches(files, sizes, 100, min_batches=2) == [['a', 'b', 'c', 'big'], ['d', 'e']]
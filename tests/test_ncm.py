@@ -3,6 +3,7 @@ import pytest
 from ncm.ncm import NCMFile
 from ncm.errors import NCMExtError, NCMMagicHeaderError
 import time
+from tests.utils import build_ncm, make_flac, SAMPLE_META
 
 # 获取测试文件的绝对路径
 TEST_FILE = os.path.join(os.path.dirname(__file__), 'files', 'test.ncm')
@@ -107,4 +108,43 @@ def test_complete_parse():
         assert ncm.meta.length > 0
         assert ncm.cover.length > 0
         assert ncm.music.length > 0
-        print("✓ 完整解析流程测试通过")
\ No newline at end of file
+        print("✓ 完整解析流程测试通过")
+
+class _PipeStream:
+    """模拟不可 seek、每次只返回少量数据的流"""
+    def __init__(self, data: bytes, step: int = 1000):
+        self.data = data
+        self.pos = 0
+        self.step = step
+
+    def read(self, size: int = -1) -> bytes:
+        size = min(size, self.step) if size >= 0 else self.step
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+    def seekable(self) -> bool:
+        return False
+
+@pytest.mark.parametrize("make_source", [
+    lambda data: data,
+    lambda data: memoryview(data),
+    lambda data: _PipeStream(data),
+])
+def test_parse_from_memory(make_source):
+    """测试从内存数据和不可 seek 的流中解析"""
+    music = make_flac(100000)
+    with NCMFile(make_source(build_ncm(music, SAMPLE_META, b'cover'))) as ncm:
+        ncm.parse()
+        assert ncm.valid
+        assert ncm.cover.detail == b'cover'
+        assert ncm.music.length == len(music)
+
+def test_stream_music_chunks():
+    """测试只解析头部后按块流式读取音乐数据"""
+    music = make_flac(100000)
+    with NCMFile(_PipeStream(build_ncm(music, SAMPLE_META))) as ncm:
+        ncm.parse_header()
+        chunks = list(ncm.iter_music(0x8000))
+        assert all(len(c) == 0x8000 for c in chunks[:-1])
+        assert sum(len(c) for c in chunks) == len(music)
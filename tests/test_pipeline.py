@@ -0,0 +1,80 @@
+import threading
+from collections import Counter
+from batch.pipeline import Stage, Pipeline
+
+def _run(pipeline, items, timeout=10):
+    """在后台线程运行流水线，超时视为卡死"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('elapsed', pipeline.run(items)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "流水线没有结束"
+    return result['elapsed']
+
+def test_pipeline_runs_every_item_through_all_stages():
+    """测试所有任务按顺序经过每个阶段，最后一个阶段结束前前面的阶段都已处理完"""
+    finished = []
+    lock = threading.Lock()
+
+    def last(x):
+        with lock:
+            finished.append(x)
+        return x
+
+    stages = [Stage('加一', lambda x: x + 1, 3, 1), Stage('乘二', lambda x: x * 2, 2, 1), Stage('收集', last, 1, 1)]
+    pipeline = Pipeline(stages)
+    _run(pipeline, range(50))
+    assert sorted(finished) == sorted((x + 1) * 2 for x in range(50))
+    assert [s.processed for s in stages] == [50, 50, 50]
+    assert all(not t.is_alive() for s in stages for t in s.threads)
+    assert len(pipeline.summary(1.0)) == 3
+
+def test_on_done_called_once_per_job():
+    """测试失败 (返回 None 或抛出异常) 和完成的任务都恰好调用一次 on_done"""
+    done = Counter()
+    lock = threading.Lock()
+
+    def on_done(x):
+        with lock:
+            done[x] += 1
+
+    def first(x):
+        if x % 5 == 0:
+            raise ValueError("坏文件")
+        return x
+
+    def second(x):
+        return None if x % 3 == 0 else x
+
+    stages = [Stage('读取', first, 2, 2), Stage('解密', second, 2, 2), Stage('写入', lambda x: x, 2, 2)]
+    _run(Pipeline(stages, on_done=on_done), range(30))
+    assert done == Counter(range(30))
+    assert stages[0].failed == 6
+    assert stages[1].failed == len([x for x in range(30) if x % 5 and x % 3 == 0])
+    assert stages[2].processed == len([x for x in range(30) if x % 5 and x % 3])
+
+def test_every_stage_raising_does_not_hang():
+    def fail(x):
+        raise RuntimeError("失败")
+
+    stages = [Stage('a', fail, 1, 1), Stage('b', lambda x: x, 1, 1)]
+    _run(Pipeline(stages), range(20))
+    assert stages[0].failed == 20 and stages[1].processed == 0
+
+def test_empty_payload_fails_in_read_stage(tmp_path, capsys):
+    """测试没有音乐数据的文件在读取阶段结束，不影响其它文件"""
+    import argparse
+    from core import NCMConverter, MODE_FULL
+    from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+    music = make_flac()
+    (tmp_path / "empty.ncm").write_bytes(build_ncm(b'', SAMPLE_META))
+    (tmp_path / "song.ncm").write_bytes(build_ncm(music, SAMPLE_META))
+    args = argparse.Namespace(stages='1,1,1,1', queue_size=2, mode=MODE_FULL, tag=False,
+                              output=str(tmp_path / "out"))
+    NCMConverter().run_pipeline([str(tmp_path / "empty.ncm"), str(tmp_path / "song.ncm")], args)
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["song.flac"]
+    assert (tmp_path / "out" / "song.flac").read_bytes() == music
+    output = capsys.readouterr().out
+    assert "没有音乐数据" in output
+    assert "解密 阶段失败" not in output
@@ -0,0 +1,37 @@
+from batch.plan import Plan, plan_file
+from tag.base import PADDING_RESERVE
+from tag.cover import COVER_THUMB, COVER_FOLDER
+from tests.utils import build_ncm, make_mp3, SAMPLE_META
+
+def test_plan_from_headers(tmp_path):
+    """测试只读取文件头得到的数据量、格式和封面下载统计"""
+    with_cover = tmp_path / "a.ncm"
+    with_cover.write_bytes(build_ncm(make_mp3(5000), SAMPLE_META, cover=b'\xff\xd8' + bytes(100)))
+    needs_fetch = tmp_path / "b.ncm"
+    needs_fetch.write_bytes(build_ncm(make_mp3(7000), dict(SAMPLE_META, albumPic='http://example.com/c.jpg')))
+    broken = tmp_path / "c.ncm"
+    broken.write_bytes(b'not an ncm file')
+
+    plan = Plan([plan_file(str(p)) for p in (with_cover, needs_fetch, broken)])
+    assert plan.payload == 12000
+    assert plan.output_size() == 12102 + 2 * PADDING_RESERVE
+    assert plan.output_size(tagged=False) == 12000
+    assert [e.path for e in plan.cover_fetches()] == [str(needs_fetch)]
+    assert len(plan.errors) == 1
+    # 格式来自元数据，不解密音乐数据
+    assert "格式: flac 2" in plan.summary(threads=2)
+
+def test_output_size_cover_policy(tmp_path):
+    """测试缩略图按缩放后的尺寸估算，folder 每张专辑只计一个封面文件"""
+    cover = b'\xff\xd8' + bytes(1000)
+    files = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.ncm"
+        path.write_bytes(build_ncm(make_mp3(5000), SAMPLE_META, cover=cover))
+        files.append(str(path))
+    plan = Plan([plan_file(p) for p in files])
+    audio = 10000 + 2 * PADDING_RESERVE
+    assert plan.output_size() == audio + 2 * 1002
+    # 边长 10 的缩略图估算为 10 * 10 * 0.15 字节
+    assert plan.output_size(cover_policy=COVER_THUMB, cover_size=10) == audio + 2 * 15
+    assert plan.output_size(cover_policy=COVER_FOLDER) == audio + 1002
@@ -0,0 +1,23 @@
+import io
+import pytest
+from batch.shard import read_file_list, parse_shard, shard_key, shard_of
+
+def test_read_file_list():
+    """测试按行和按 NUL 分隔读取文件列表"""
+    assert read_file_list(io.StringIO("a.ncm\n\nb c.ncm\n")) == ['a.ncm', 'b c.ncm']
+    assert read_file_list(io.StringIO("a.ncm\0b\nc.ncm\0"), null_delimited=True) == ['a.ncm', 'b\nc.ncm']
+
+def test_parse_shard():
+    assert parse_shard('0/4') == (0, 4)
+    for spec in ('4/4', '-1/2', '1', 'a/b', '0/0'):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+def test_shards_are_disjoint_and_complete():
+    """测试所有分片互不重叠且覆盖全部文件，结果与根目录无关"""
+    files = [f"歌手{i}/专辑/{i}.ncm" for i in range(200)]
+    count = 3
+    shards = [[f for f in files if shard_of(shard_key(f), count) == i] for i in range(count)]
+    assert sorted(sum(shards, [])) == sorted(files)
+    assert all(shards)
+    assert shard_key('/mnt/a/x/y.ncm', '/mnt/a') == shard_key('/srv/a/x/y.ncm', '/srv/a') == 'x/y.ncm'
@@ -0,0 +1,43 @@
+import json
+from core import NCMConverter, MODE_DECRYPT, MODE_META
+from tag.sidecar import write_sidecar
+from converter.converter import Meta, Album, Artist
+from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16
+JPG = b'\xff\xd8\xff\xe0' + b'\x00' * 16
+
+def _meta() -> Meta:
+    album = Album(id=2002, name='测试专辑', cover_url='http://example.com/a.jpg')
+    return Meta(id=1001, name='测试歌曲', album=album, artists=[Artist(id=1, name='歌手甲')],
+                bit_rate=999000, duration=1000, format='flac')
+
+def test_sidecar_json_and_cover_extension(tmp_path):
+    """测试旁路文件的 JSON 内容，以及按封面数据选择 png/jpg 扩展名"""
+    base = str(tmp_path / 'song')
+    assert write_sidecar(base, _meta(), PNG) == [f"{base}.json", f"{base}.png"]
+    data = json.loads((tmp_path / 'song.json').read_text(encoding='utf-8'))
+    assert data == {
+        'musicId': 1001, 'musicName': '测试歌曲', 'artist': [['歌手甲', 1]],
+        'bitrate': 999000, 'duration': 1000, 'format': 'flac',
+        'albumId': 2002, 'album': '测试专辑', 'albumPic': 'http://example.com/a.jpg',
+    }
+    assert (tmp_path / 'song.png').read_bytes() == PNG
+
+    assert write_sidecar(base, _meta(), JPG)[1] == f"{base}.jpg"
+    assert write_sidecar(str(tmp_path / 'bare'), _meta(), None) == [str(tmp_path / 'bare.json')]
+
+def test_meta_mode_writes_sidecar_only(tmp_path):
+    """测试 meta 模式只导出元数据和封面，不写出音频"""
+    (tmp_path / 'song.ncm').write_bytes(build_ncm(make_flac(), SAMPLE_META, JPG))
+    out = tmp_path / 'out'
+    NCMConverter().convert_file(str(tmp_path / 'song.ncm'), str(out), mode=MODE_META)
+    assert sorted(p.name for p in out.iterdir()) == ['song.jpg', 'song.json']
+    assert json.loads((out / 'song.json').read_text(encoding='utf-8'))['musicName'] == '测试歌曲'
+
+def test_decrypt_mode_skips_tags(tmp_path):
+    """测试 decrypt 模式输出与原始音频完全一致，不添加标签和封面"""
+    music = make_flac()
+    (tmp_path / 'song.ncm').write_bytes(build_ncm(music, SAMPLE_META, JPG))
+    output = NCMConverter().convert_file(str(tmp_path / 'song.ncm'), str(tmp_path), mode=MODE_DECRYPT)
+    assert open(output, 'rb').read() == music
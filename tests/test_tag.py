@@ -0,0 +1,24 @@
+from mutagen.flac import FLAC
+from core import NCMConverter, MODE_RETAG
+from tests.utils import build_ncm, make_flac, SAMPLE_META
+
+def test_retag_in_place(tmp_path):
+    """测试重新写标签只修改元数据块，不改变文件大小和音频数据"""
+    ncm_path = tmp_path / 'song.ncm'
+    ncm_path.write_bytes(build_ncm(make_flac(200000), SAMPLE_META))
+    converter = NCMConverter()
+    output = converter.convert_file(str(ncm_path), str(tmp_path))
+    before = open(output, 'rb').read()
+    assert FLAC(output)['title'] == [SAMPLE_META['musicName']]
+
+    # 元数据变化后只更新标签
+    meta = dict(SAMPLE_META, musicName='新标题')
+    ncm_path.write_bytes(build_ncm(make_flac(200000), meta))
+    assert converter.convert_file(str(ncm_path), str(tmp_path), mode=MODE_RETAG) == output
+
+    after = open(output, 'rb').read()
+    tags = FLAC(output)
+    assert tags['title'] == ['新标题']
+    assert tags['artist'] == ['歌手甲', '歌手乙']
+    assert len(after) == len(before)
+    assert after[-200000:] == before[-200000:]
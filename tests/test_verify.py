@@ -0,0 +1,32 @@
+import pytest
+from core import NCMConverter
+from verify.verify import verify_output
+from tests.utils import build_ncm, make_flac, make_mp3, SAMPLE_META
+
+@pytest.mark.parametrize("fmt, make_music", [('flac', make_flac), ('mp3', make_mp3)])
+def test_verify_output(tmp_path, fmt, make_music):
+    """测试校验通过、截断和解密错误三种情况"""
+    ncm_path = tmp_path / 'song.ncm'
+    ncm_path.write_bytes(build_ncm(make_music(200000), dict(SAMPLE_META, format=fmt)))
+    output = NCMConverter().convert_file(str(ncm_path), str(tmp_path))
+    assert output.endswith(f'.{fmt}')
+
+    assert verify_output(output, str(ncm_path)).ok
+    data = open(output, 'rb').read()
+
+    with open(output, 'wb') as f:
+        f.write(data[:-1000])
+    result = verify_output(output, str(ncm_path))
+    assert not result.ok and '长度' in result.error
+
+    corrupted = bytearray(data)
+    corrupted[-10] ^= 0xff
+    with open(output, 'wb') as f:
+        f.write(corrupted)
+    assert not verify_output(output, str(ncm_path)).ok
+
+def test_verify_rejects_bad_structure(tmp_path):
+    """测试没有源文件时只检查容器结构"""
+    path = tmp_path / 'bad.flac'
+    path.write_bytes(b'fLaC' + bytes(100))
+    assert not verify_output(str(path)).ok
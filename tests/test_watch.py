@@ -0,0 +1,63 @@
+import threading
+import pytest
+import batch.watch as watch
+from batch.watch import Watcher
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(watch.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_settle_and_reconvert(tmp_path, clock):
+    """测试文件大小在 settle 秒内不再变化才返回，已处理的文件只有变化后才会再次返回"""
+    path = tmp_path / "a.ncm"
+    path.write_bytes(b'x' * 10)
+    watcher = Watcher([str(tmp_path)], settle=1.0, use_inotify=False)
+
+    watcher._poll_file(str(path))
+    assert watcher._collect_ready() == []  # 第一次只记录大小
+    clock[0] = 0.5
+    path.write_bytes(b'x' * 20)            # 仍在下载
+    assert watcher._collect_ready() == []
+    clock[0] = 1.2
+    assert watcher._collect_ready() == []  # 距离上次变化不足 settle
+    clock[0] = 1.6
+    assert watcher._collect_ready() == [str(path)]
+    assert not watcher.pending
+
+    # 重新扫描时未变化的文件不会重复转换，变化后会再次转换
+    watcher._poll_file(str(path))
+    assert not watcher.pending
+    path.write_bytes(b'y' * 30)
+    watcher._poll_file(str(path))
+    assert str(path) in watcher.pending
+
+def test_ignores_empty_and_other_files(tmp_path, clock):
+    (tmp_path / "empty.ncm").write_bytes(b'')
+    (tmp_path / "a.mp3").write_bytes(b'x')
+    watcher = Watcher([str(tmp_path)], settle=1.0, use_inotify=False)
+    watcher._scan(str(tmp_path), 1, watch=False)
+    assert list(watcher.pending) == [str(tmp_path / "empty.ncm")]
+    watcher._collect_ready()
+    clock[0] = 5
+    assert watcher._collect_ready() == []
+
+def test_poll_backend_yields_new_files(tmp_path):
+    """测试轮询模式下启动时已有的文件和之后新出现的文件都会返回"""
+    (tmp_path / "old.ncm").write_bytes(b'x')
+    watcher = Watcher([str(tmp_path)], settle=0.1, poll_interval=0.02, use_inotify=False)
+    assert watcher.backend == 'poll'
+    files = watcher.ready_files()
+    result = []
+
+    def take():
+        result.append(next(files))
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "new.ncm").write_bytes(b'y')
+        result.append(next(files))
+
+    thread = threading.Thread(target=take, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert result == [str(tmp_path / "old.ncm"), str(tmp_path / "sub" / "new.ncm")]
@@ -0,0 +1,72 @@
+import json
+import base64
+import struct
+from typing import Optional
+
+import numpy as np
+from Crypto.Cipher import AES
+
+from converter.converter import AES_CORE_KEY, AES_MODIFY_KEY
+from converter.utils import build_key_box
+from converter.cipher import process_chunk
+
+def _pad(data: bytes) -> bytes:
+    """PKCS7 填充"""
+    n = AES.block_size - len(data) % AES.block_size
+    return data + bytes([n]) * n
+
+def _encrypt_aes128(key: bytes, data: bytes) -> bytes:
+    """AES-128 ECB模式加密"""
+    return AES.new(key, AES.MODE_ECB).encrypt(_pad(data))
+
+def make_flac(audio_size: int = 4096) -> bytes:
+    """构造一个只有 STREAMINFO 和伪音频帧的最小 FLAC 数据"""
+    # 4096 样本/块, 44100Hz, 双声道, 16bit
+    packed = (44100 << 44) | (1 << 41) | (15 << 36) | 44100
+    streaminfo = struct.pack('>HH', 4096, 4096) + bytes(6) + packed.to_bytes(8, 'big') + bytes(16)
+    header = b'fLaC' + bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo
+    frame = b'\xff\xf8' + bytes((i * 7) & 0xff for i in range(audio_size - 2))
+    return header + frame
+
+def make_mp3(audio_size: int = 4096) -> bytes:
+    """构造由连续 MPEG-1 Layer III 帧 (128kbps, 44100Hz, 每帧 417 字节) 组成的伪 MP3 数据"""
+    frame = b'\xff\xfb\x90\x00' + bytes((i * 13) & 0xff for i in range(413))
+    return (frame * (audio_size // len(frame) + 1))[:audio_size]
+
+def build_ncm(music: bytes, meta: Optional[dict] = None, cover: bytes = b'',
+              rc4_key: bytes = b'0123456789abcdef0123456789abcdef') -> bytes:
+    """按 NCM 布局构造测试数据"""
+    key = _encrypt_aes128(AES_CORE_KEY, b'neteasecloudmusic' + rc4_key)
+    key = bytes(b ^ 0x64 for b in key)
+
+    meta_block = b''
+    if meta is not None:
+        raw = _encrypt_aes128(AES_MODIFY_KEY, b'music:' + json.dumps(meta).encode())
+        meta_block = bytes(b ^ 0x63 for b in b"163 key(Don't modify):" + base64.b64encode(raw))
+
+    box = np.array(build_key_box(rc4_key), dtype=np.uint8)
+    encrypted = bytearray()
+    for i in range(0, len(music), 0x8000):
+        chunk = np.frombuffer(music[i:i + 0x8000], dtype=np.uint8)
+        encrypted.extend(process_chunk(chunk, box))
+
+    return b''.join([
+        struct.pack('<II', 0x4e455443, 0x4d414446), b'\x00\x00',
+        struct.pack('<I', len(key)), key,
+        struct.pack('<I', len(meta_block)), meta_block,
+        bytes(9),
+        struct.pack('<I', len(cover)), cover,
+        bytes(encrypted),
+    ])
+
+SAMPLE_META = {
+    'musicId': 1001,
+    'musicName': '测试歌曲',
+    'artist': [['歌手甲', 1], ['歌手乙', 2]],
+    'albumId': 2002,
+    'album': '测试专辑',
+    'albumPic': '',
+    'bitrate': 999000,
+    'duration': 1000,
+    'format': 'flac',
+}
@@ -0,0 +1,70 @@
+import os
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from ncm.ncm import NCMFile
+from converter.converter import Converter
+from converter.utils import xor_stream
+
+class VerifyError(Exception):
+    """输出文件结构校验失败"""
+    pass
+
+class Reader(ABC):
+    """按偏移随机读取数据的抽象，校验只读取少量结构数据"""
+
+    length: int = 0
+
+    @abstractmethod
+    def read(self, offset: int, size: int) -> bytes:
+        """读取 [offset, offset + size) 范围内的数据，越界部分被截断"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class FileReader(Reader):
+    """读取普通文件"""
+
+    def __init__(self, path: str):
+        self.fd: BinaryIO = open(path, 'rb')
+        self.length = os.fstat(self.fd.fileno()).st_size
+
+    def read(self, offset: int, size: int) -> bytes:
+        self.fd.seek(offset)
+        return self.fd.read(max(0, min(size, self.length - offset)))
+
+    def close(self) -> None:
+        self.fd.close()
+
+class PayloadReader(Reader):
+    """
+    随机读取 NCM 文件中解密后的音乐数据。密钥流只取决于位置对 256 取模，
+    所以只需要解密读取到的几个字节，不需要处理整个文件。
+    """
+
+    def __init__(self, ncm_path: str):
+        self.ncm_file = NCMFile(ncm_path)
+        try:
+            self.ncm_file.parse_header()
+            self.key_stream = Converter(self.ncm_file).key_stream()
+            self.offset = self.ncm_file.music_offset
+            self.length = os.fstat(self.ncm_file.fd.fileno()).st_size - self.offset
+            self.ncm_file.music.length = self.length
+        except Exception:
+            self.ncm_file.close()
+            raise
+
+    def read(self, offset: int, size: int) -> bytes:
+        self.ncm_file.fd.seek(self.offset + offset)
+        data = self.ncm_file.fd.read(max(0, min(size, self.length - offset)))
+        return xor_stream(data, offset, self.key_stream)
+
+    def close(self) -> None:
+        self.ncm_file.close()
@@ -0,0 +1,45 @@
+from typing import Tuple
+from .base import Reader, VerifyError
+from converter.utils import id3_size
+
+STREAMINFO = 0
+STREAMINFO_LENGTH = 34
+
+def is_frame_sync(data: bytes) -> bool:
+    """FLAC 帧头同步码 0b11111111111110 + 保留位 0"""
+    return len(data) >= 2 and data[0] == 0xff and data[1] & 0xfe == 0xf8
+
+def audio_region(reader: Reader) -> Tuple[int, int]:
+    """
+    校验 fLaC 标识、STREAMINFO 和各元数据块头部，
+    返回音频帧数据的范围 (起始偏移, 结束偏移)
+    """
+    offset = id3_size(reader.read(0, 10))
+    if reader.read(offset, 4) != b'fLaC':
+        raise VerifyError("缺少 fLaC 标识")
+    offset += 4
+
+    first = True
+    while True:
+        header = reader.read(offset, 4)
+        if len(header) < 4:
+            raise VerifyError("元数据块头部被截断")
+        is_last = header[0] & 0x80
+        block_type = header[0] & 0x7f
+        length = int.from_bytes(header[1:4], 'big')
+
+        if first and (block_type != STREAMINFO or length != STREAMINFO_LENGTH):
+            raise VerifyError("第一个元数据块不是 STREAMINFO")
+        if block_type == 127:
+            raise VerifyError(f"无效的元数据块类型: {block_type}")
+        first = False
+
+        offset += 4 + length
+        if offset > reader.length:
+            raise VerifyError("元数据块超出文件长度")
+        if is_last:
+            break
+
+    if not is_frame_sync(reader.read(offset, 2)):
+        raise VerifyError("元数据之后不是 FLAC 帧头")
+    return offset, reader.length
@@ -0,0 +1,60 @@
+from typing import Optional, Tuple
+from .base import Reader, VerifyError
+from converter.utils import id3_size, is_mpeg_frame_sync
+
+# 比特率表 (kbps)，按 [MPEG-1 / MPEG-2(.5)][层] 索引
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# 校验开头连续多少个帧
+CHECK_FRAMES = 8
+
+def frame_length(header: bytes) -> Optional[int]:
+    """根据帧头计算帧长度，帧头无效时返回 None"""
+    if not is_mpeg_frame_sync(header) or len(header) < 4:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    version = 1 if version_bits == 3 else 2
+    bitrate = BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][rate_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and version == 2:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+def audio_region(reader: Reader) -> Tuple[int, int]:
+    """
+    校验 ID3v2 大小和开头若干 MPEG 帧的同步字，
+    返回音频数据的范围 (起始偏移, 结束偏移)，不含 ID3v2/ID3v1 标签
+    """
+    start = id3_size(reader.read(0, 10))
+    end = reader.length
+    if start > end:
+        raise VerifyError("ID3 标签超出文件长度")
+    if end - start >= 128 and reader.read(end - 128, 3) == b'TAG':
+        end -= 128
+
+    offset = start
+    for i in range(CHECK_FRAMES):
+        if offset >= end:
+            break
+        length = frame_length(reader.read(offset, 4))
+        if length is None:
+            raise VerifyError(f"第 {i + 1} 个 MPEG 帧头无效 (偏移 {offset})")
+        offset += length
+    return start, end
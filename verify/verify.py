@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import flac, mp3
+from .base import Reader, FileReader, PayloadReader, VerifyError
+
+# 对比输出和源数据时，在音频开头和结尾各取一段样本
+SAMPLE_SIZE = 4096
+
+AUDIO_REGION: Dict[str, Callable[[Reader], Tuple[int, int]]] = {
+    'flac': flac.audio_region,
+    'mp3': mp3.audio_region,
+}
+
+@dataclass
+class VerifyResult:
+    path: str
+    format: str = ''
+    ok: bool = False
+    error: str = ''
+
+def _compare_samples(output: Reader, out_start: int, payload: Reader, src_start: int, length: int) -> None:
+    """对比音频开头和结尾的样本，检查解密是否正确"""
+    for offset in sorted({0, max(0, length - SAMPLE_SIZE)}):
+        if output.read(out_start + offset, SAMPLE_SIZE) != payload.read(src_start + offset, SAMPLE_SIZE):
+            raise VerifyError(f"音频数据与源文件不一致 (偏移 {offset})")
+
+def verify_output(output_path: str, ncm_path: Optional[str] = None) -> VerifyResult:
+    """
+    只解析输出文件的容器结构 (不解码音频)。给出源 NCM 文件时，
+    还会对比去掉标签后的音频长度和首尾样本，发现截断或解密错误。
+    """
+    format_type = output_path.rsplit('.', 1)[-1].lower()
+    result = VerifyResult(path=output_path, format=format_type)
+    region = AUDIO_REGION.get(format_type)
+    if region is None:
+        result.error = f"不支持的格式: {format_type}"
+        return result
+
+    try:
+        with FileReader(output_path) as output:
+            out_start, out_end = region(output)
+            if ncm_path:
+                with PayloadReader(ncm_path) as payload:
+                    src_start, src_end = region(payload)
+                    expected = src_end - src_start
+                    actual = out_end - out_start
+                    if actual != expected:
+                        raise VerifyError(f"音频长度 {actual} 与源文件 {expected} 不一致")
+                    _compare_samples(output, out_start, payload, src_start, actual)
+        result.ok = True
+    except VerifyError as e:
+        result.error = str(e)
+    except Exception as e:
+        result.error = f"校验失败: {str(e)}"
+    return result
+
+def verify_files(pairs: List[Tuple[str, Optional[str]]], max_workers: int = 4) -> List[VerifyResult]:
+    """并行校验 (输出文件, 源NCM文件) 列表"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda p: verify_output(*p), pairs))